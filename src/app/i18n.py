@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+User-visible strings for the Email Assistant web interface.
+
+This module holds one translation table per supported locale so that a single
+interface module can serve every language. The active table is selected with
+the LOCALE setting.
+"""
+
+STRINGS = {
+    "en": {
+        "title": "Email Assistant",
+        "header": "# Email Assistant with LangGraph Memory",
+        "description": "Process emails and get AI-powered responses with long-term memory.",
+        "classification_map": {
+            "respond": "📧 RESPOND - This email requires a response",
+            "ignore": "🚫 IGNORE - This email can be safely ignored",
+            "notify": "🔔 NOTIFY - This email contains important information"
+        },
+        "unknown_classification": "Unknown: {classification}",
+        "result_template": "\n## Classification: {classification}\n\n### Reasoning:\n{reasoning}\n",
+        "tool_prefix": "🛠️ Tool Call: ",
+        "system_prefix": "System: ",
+        "sections": {
+            "email_input": "### Email Input",
+            "email_analysis": "### Email Analysis",
+            "feedback": "Feedback and Optimization",
+            "feedback_description": "Provide feedback on the response to help improve the assistant:",
+            "process_tab": "Process Email",
+            "process_tab_description": "The main processing screen is shown above.",
+            "prompts_tab": "Prompt Management",
+            "prompts_header": "### View and Edit Prompts",
+            "prompts_description": "Customize the prompts used by the email assistant."
+        },
+        "labels": {
+            "user_id": "User ID",
+            "author": "From",
+            "to": "To",
+            "subject": "Subject",
+            "email_body": "Email Body",
+            "classification": "Classification",
+            "chatbot": "Agent Interaction",
+            "feedback": "Feedback",
+            "optimization_result": "Optimization Result",
+            "main_agent_prompt": "Main Agent Instructions",
+            "ignore_prompt": "Triage - Ignore Rules",
+            "notify_prompt": "Triage - Notify Rules",
+            "respond_prompt": "Triage - Respond Rules"
+        },
+        "info": {
+            "user_id": "Used for memory namespacing",
+            "prompt_user_id": "Enter the user ID to load/save prompts for"
+        },
+        "placeholders": {
+            "author": "e.g. Alice Smith <alice.smith@company.com>",
+            "to": "e.g. John Doe <john.doe@company.com>",
+            "subject": "Quick question about API documentation",
+            "email_body": "Hi John,\n\nI was reviewing the API documentation...\n\nThanks,\nAlice",
+            "feedback": "e.g. 'Always sign emails with \"John Doe\"' or 'Ignore emails from marketing@company.com' or 'Ignore emails from build@company.com'",
+            "main_agent_prompt": "Instructions for the main agent...",
+            "ignore_prompt": "Rules for ignoring emails...",
+            "notify_prompt": "Rules for email notifications...",
+            "respond_prompt": "Rules for responding to emails..."
+        },
+        "buttons": {
+            "process": "Process Email",
+            "feedback": "Submit Feedback and Optimize",
+            "load_prompts": "Load Prompts",
+            "save_prompts": "Save Prompts"
+        },
+        "examples": [
+            [
+                "user123",
+                "Alice Smith <alice.smith@company.com>",
+                "John Doe <john.doe@company.com>",
+                "Project status",
+                "Hi John,\n\nCould we have a quick meeting tomorrow to go over the project status?\n\nThanks,\nAlice"
+            ],
+            [
+                "user123",
+                "Marketing Team <marketing@company.com>",
+                "All Staff <all-staff@company.com>",
+                "[Announcement] New product launch next week",
+                "Hello everyone,\n\nWe are holding a new product launch event next Friday at 2pm. Please join us!\n\nBest regards,\nMarketing Team"
+            ],
+            [
+                "user123",
+                "Build System <build@company.com>",
+                "Engineering <engineering@company.com>",
+                "[Alert] Build failed on main branch",
+                "Build #4592 failed on the main branch.\n\nCause: unit test failure in the authentication module\nLog details: https://build.company.com/4592"
+            ]
+        ]
+    },
+    "ja": {
+        "title": "メールアシスタント",
+        "header": "# メールアシスタント with LangGraph メモリー",
+        "description": "メールを処理し、長期記憶機能を備えたAIによる返答を得ることができます。",
+        "classification_map": {
+            "respond": "📧 返信が必要 - このメールには返信が必要です",
+            "ignore": "🚫 無視してよい - このメールは無視しても問題ありません",
+            "notify": "🔔 通知 - このメールには重要な情報が含まれています"
+        },
+        "unknown_classification": "不明: {classification}",
+        "result_template": "\n## 分類結果: {classification}\n\n### 理由:\n{reasoning}\n",
+        "tool_prefix": "🛠️ ツール実行: ",
+        "system_prefix": "システム: ",
+        "sections": {
+            "email_input": "### メール入力",
+            "email_analysis": "### メール分析",
+            "feedback": "フィードバックと最適化",
+            "feedback_description": "返答に対するフィードバックを提供して、アシスタントの改善に協力してください：",
+            "process_tab": "メール処理",
+            "process_tab_description": "上記がメイン処理画面です。",
+            "prompts_tab": "プロンプト管理",
+            "prompts_header": "### プロンプトの閲覧と編集",
+            "prompts_description": "メールアシスタントで使用されるプロンプトをカスタマイズできます。"
+        },
+        "labels": {
+            "user_id": "ユーザーID",
+            "author": "差出人",
+            "to": "宛先",
+            "subject": "件名",
+            "email_body": "メール本文",
+            "classification": "分類結果",
+            "chatbot": "エージェントとのやりとり",
+            "feedback": "フィードバック",
+            "optimization_result": "最適化結果",
+            "main_agent_prompt": "メインエージェントの指示",
+            "ignore_prompt": "振り分け - 無視ルール",
+            "notify_prompt": "振り分け - 通知ルール",
+            "respond_prompt": "振り分け - 返信ルール"
+        },
+        "info": {
+            "user_id": "メモリの名前空間に使用されます",
+            "prompt_user_id": "プロンプトを読み込み/保存するユーザーIDを入力してください"
+        },
+        "placeholders": {
+            "author": "例: 田中花子 <hanako.tanaka@company.com>",
+            "to": "例: 鈴木一郎 <ichiro.suzuki@company.com>",
+            "subject": "APIドキュメントについての質問",
+            "email_body": "鈴木様\n\nAPIドキュメントを確認していたのですが...\n\n田中",
+            "feedback": "例: 'メールの最後は必ず「鈴木一郎」と署名してください' または 'marketing@company.comからのメールは無視してください' または 'build@company.comからのメールは無視してください'",
+            "main_agent_prompt": "メインエージェントへの指示...",
+            "ignore_prompt": "メールを無視するためのルール...",
+            "notify_prompt": "メール通知のルール...",
+            "respond_prompt": "メールに返信するためのルール..."
+        },
+        "buttons": {
+            "process": "メールを処理",
+            "feedback": "フィードバックを送信して最適化",
+            "load_prompts": "プロンプトを読み込む",
+            "save_prompts": "プロンプトを保存"
+        },
+        "examples": [
+            [
+                "user123",
+                "田中花子 <hanako.tanaka@company.com>",
+                "鈴木一郎 <ichiro.suzuki@company.com>",
+                "プロジェクト状況について",
+                "鈴木様\n\n明日、プロジェクトの状況について簡単に打ち合わせできますでしょうか？\n\nよろしくお願いいたします。\n田中"
+            ],
+            [
+                "user123",
+                "マーケティングチーム <marketing@company.com>",
+                "全社員 <all-staff@company.com>",
+                "【お知らせ】来週の新製品発表について",
+                "皆様\n\n来週金曜日14時から新製品発表会を開催いたします。ぜひご参加ください。\n\n以上\nマーケティングチーム"
+            ],
+            [
+                "user123",
+                "ビルドシステム <build@company.com>",
+                "エンジニアリング <engineering@company.com>",
+                "【警告】mainブランチのビルド失敗",
+                "ビルド #4592 がmainブランチで失敗しました。\n\n原因: 認証モジュールの単体テスト失敗\nログ詳細: https://build.company.com/4592"
+            ]
+        ]
+    }
+}
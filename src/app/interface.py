@@ -8,9 +8,78 @@ This module implements the user interface using Gradio, allowing users to
 interact with the email assistant through a web browser.
 """
 
+import asyncio
+from functools import lru_cache
+from operator import attrgetter
 import gradio as gr
 from src.utils.logger import debug, info
-from src.memory.manager import optimize_prompts, load_prompts, save_prompts
+from src.core.config import DEFAULT_USER_ID, QUEUE_MAX_SIZE, get_settings
+from src.app.i18n import STRINGS
+from src.memory.manager import optimize_prompts, load_prompts, save_prompts, load_cached_prompts
+
+
+def normalize_whitespace(text):
+    """
+    Normalize whitespace in an email body so identical emails compare equal.
+    
+    Strips surrounding whitespace and trailing whitespace on each line, and
+    unifies line endings.
+    
+    Args:
+        text: Raw email body.
+        
+    Returns:
+        str: The normalized email body.
+    """
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+# User-visible strings for the configured locale
+S = STRINGS[get_settings().locale]
+
+# Display text for each classification result
+_CLASSIFICATION_MAP = S["classification_map"]
+
+# Markdown template for the classification result
+_RESULT_TMPL = S["result_template"].format_map
+
+# Prefixes for tool and system messages in the chatbot
+_TOOL_PREFIX = S["tool_prefix"]
+_SYSTEM_PREFIX = S["system_prefix"]
+
+
+def _fmt_user(message, content):
+    # Add a user message
+    return {"role": "user", "content": content}
+
+
+def _fmt_ai(message, content):
+    # Add an assistant message
+    return {"role": "assistant", "content": content}
+
+
+def _fmt_tool(message, content):
+    # Tool calls are shown as assistant messages with tool prefix
+    tool_name = getattr(message, 'name', None) or "Unknown Tool"
+    return {"role": "assistant", "content": _TOOL_PREFIX + tool_name + "\n" + str(content)}
+
+
+def _fmt_system(message, content):
+    # Other message types shown as system messages
+    return {"role": "system", "content": _SYSTEM_PREFIX + str(content)}
+
+
+# Chatbot formatter for each LangChain message type
+_MSG_FORMATTERS = {
+    "human": _fmt_user,
+    "ai": _fmt_ai,
+    "tool": _fmt_tool
+}
+
+
+def _message_content(message):
+    content = getattr(message, 'content', None)
+    return str(message) if content is None else content
 
 
 def format_messages_for_chatbot(messages):
@@ -23,45 +92,23 @@ def format_messages_for_chatbot(messages):
     Returns:
         list: Formatted messages for Gradio Chatbot.
     """
-    formatted_messages = []
+    get_formatter = _MSG_FORMATTERS.get
+    content_of = _message_content
     
-    for message in messages:
-        content = message.content if hasattr(message, 'content') else str(message)
-        
-        # Handle different message types appropriately
-        if message.type == 'human':
-            # Add a user message
-            formatted_messages.append({
-                "role": "user",
-                "content": content
-            })
-        elif message.type == 'ai':
-            # Add an assistant message
-            formatted_messages.append({
-                "role": "assistant",
-                "content": content
-            })
-        elif message.type == 'tool':
-            # Tool calls are shown as assistant messages with tool prefix
-            tool_name = message.name if hasattr(message, 'name') else "Unknown Tool"
-            tool_message = f"🛠️ ツール実行: {tool_name}\n{content}"
-            formatted_messages.append({
-                "role": "assistant",
-                "content": tool_message
-            })
-        else:
-            # Other message types shown as system messages
-            formatted_messages.append({
-                "role": "system",
-                "content": f"システム: {content}"
-            })
-    
-    return formatted_messages
+    return [
+        get_formatter(message.type, _fmt_system)(message, content_of(message))
+        for message in messages
+    ]
 
 
-def process_email(email_agent, store, llm, user_id, author, to, subject, email_body):
+async def process_email(email_agent, store, llm, user_id, author, to, subject, email_body,
+                        response_cache=None):
     """
-    Process an email using the Email Assistant agent.
+    Process an email using the Email Assistant agent, streaming progress.
+    
+    The agent is run with ``astream`` so that intermediate results are yielded
+    as soon as each LangGraph node completes, instead of blocking until the
+    whole graph has finished.
     
     Args:
         email_agent: The LangGraph email assistant agent.
@@ -72,194 +119,316 @@ def process_email(email_agent, store, llm, user_id, author, to, subject, email_b
         to: Email recipient.
         subject: Email subject.
         email_body: Email content.
+        response_cache: Optional ResponseCache serving near-duplicate emails.
         
-    Returns:
-        tuple: (classification_result, chatbot_messages)
+    Yields:
+        tuple: (classification_result, messages_state) - The messages state is
+            a dict holding the number of raw messages seen so far ("raw_len")
+            and their formatted chatbot messages ("formatted").
     """
     # Create the email input dictionary
     email_input = {
         "author": author,
         "to": to,
         "subject": subject,
-        "email_thread": email_body
+        "email_thread": normalize_whitespace(email_body)
     }
     
     # Create the config dictionary
     config = {"configurable": {"langgraph_user_id": user_id}}
     
-    # Define the initial state
-    initial_state = {"email_input": email_input, "messages": []}
+    # Define the initial state, with the user's prompts rendered once up front
+    initial_state = {
+        "email_input": email_input,
+        "messages": [],
+        **await asyncio.to_thread(load_cached_prompts, store, user_id)
+    }
+    
+    # Stream the full graph state after each node completes
+    if response_cache is not None:
+        stream = response_cache.astream(email_agent, initial_state, config)
+    else:
+        stream = email_agent.astream(initial_state, config=config, stream_mode="values")
     
-    # Invoke the email agent
-    response = email_agent.invoke(initial_state, config=config)
+    # Only messages appended since the previous graph step are formatted
+    messages_state = {"raw_len": 0, "formatted": []}
+    response = initial_state
+    async for response in stream:
+        if "classification" not in response:
+            continue
+        yield render_response(response, messages_state)
     
+    info(f"Email processed - Classification: {response.get('classification', 'Not classified')}")
+
+
+async def process_email_batch(email_agent, store, user_ids, authors, tos, subjects, email_bodies):
+    """
+    Process a batch of emails concurrently using the Email Assistant agent.
+    
+    Each argument is a list with one entry per email, as delivered by a
+    Gradio batched event. The whole batch is dispatched with a single
+    ``abatch`` call so that LLM round-trips overlap.
+    
+    Args:
+        email_agent: The LangGraph email assistant agent.
+        store: Memory store instance.
+        user_ids: User IDs for memory namespacing.
+        authors: Email senders.
+        tos: Email recipients.
+        subjects: Email subjects.
+        email_bodies: Email contents.
+        
+    Returns:
+        tuple: (classification_results, messages_states) - One list per output.
+    """
+    states = [
+        {
+            "email_input": {
+                "author": author,
+                "to": to,
+                "subject": subject,
+                "email_thread": normalize_whitespace(email_body)
+            },
+            "messages": [],
+            **await asyncio.to_thread(load_cached_prompts, store, user_id)
+        }
+        for user_id, author, to, subject, email_body in zip(user_ids, authors, tos, subjects, email_bodies)
+    ]
+    configs = [{"configurable": {"langgraph_user_id": user_id}} for user_id in user_ids]
+    
+    responses = await email_agent.abatch(states, config=configs)
+    
+    rendered = [render_response(response) for response in responses]
+    info(f"Email batch processed - {len(rendered)} emails")
+    
+    return [result for result, _ in rendered], [messages_state for _, messages_state in rendered]
+
+
+@lru_cache(maxsize=64)
+def render_classification(classification, reasoning):
+    """
+    Render the classification result markdown.
+    
+    Results are memoized: while streaming, the same classification is
+    rendered again after every graph step.
+    
+    Args:
+        classification: The classification label.
+        reasoning: Reasoning behind the classification.
+        
+    Returns:
+        str: Markdown describing the classification.
+    """
+    classification_text = _CLASSIFICATION_MAP.get(classification)
+    if classification_text is None:
+        classification_text = S["unknown_classification"].format(classification=classification)
+    
+    return _RESULT_TMPL({"classification": classification_text, "reasoning": reasoning})
+
+
+def render_response(response, messages_state=None):
+    """
+    Render a (partial) graph state for display.
+    
+    Messages are appended to the graph state, so only the suffix not yet
+    recorded in ``messages_state`` is formatted and added to it.
+    
+    Args:
+        response: The graph state emitted by the agent.
+        messages_state: Dict with "raw_len" and "formatted" from a previous
+            step of the same run, updated in place. A new one is created if None.
+        
+    Returns:
+        tuple: (classification_result, messages_state)
+    """
     # Extract classification and reasoning
     classification = response.get("classification", "Not classified")
     reasoning = response.get("reasoning", "No reasoning provided")
     
     # Format the classification result for display
-    classification_map = {
-        "respond": "📧 返信が必要 - このメールには返信が必要です",
-        "ignore": "🚫 無視してよい - このメールは無視しても問題ありません",
-        "notify": "🔔 通知 - このメールには重要な情報が含まれています"
-    }
-    classification_text = classification_map.get(classification, f"不明: {classification}")
-    
-    # Create the classification result markdown
-    classification_result = f"""
-## 分類結果: {classification_text}
-
-### 理由:
-{reasoning}
-"""
-    
-    # Format messages for the chatbot
-    chatbot_messages = format_messages_for_chatbot(response.get("messages", []))
+    classification_result = render_classification(classification, reasoning)
     
-    info(f"Email processed - Classification: {classification}")
+    # Format only the messages added since the previous step
+    if messages_state is None:
+        messages_state = {"raw_len": 0, "formatted": []}
+    messages = response.get("messages", [])
+    messages_state["formatted"].extend(format_messages_for_chatbot(messages[messages_state["raw_len"]:]))
+    messages_state["raw_len"] = len(messages)
     
-    return classification_result, chatbot_messages
+    return classification_result, messages_state
 
 
-def create_gradio_interface(email_agent, store, llm):
+def create_gradio_interface(services):
     """
     Create the Gradio web interface for the Email Assistant.
     
     Args:
-        email_agent: The LangGraph email assistant agent.
-        store: Memory store instance.
-        llm: Language model instance.
+        services: LazyServices holding the agent, memory store, language
+            model and optional response cache used by the event handlers.
         
     Returns:
         gr.Blocks: The Gradio interface.
     """
-    with gr.Blocks(title="メールアシスタント") as demo:
-        gr.Markdown("# メールアシスタント with LangGraph メモリー")
-        gr.Markdown("メールを処理し、長期記憶機能を備えたAIによる返答を得ることができます。")
+    async def resolve(*names):
+        # Lazily constructed services are built off the event loop on first
+        # use; once built they are read directly
+        if services.built(*names):
+            return attrgetter(*names)(services)
+        return await asyncio.to_thread(attrgetter(*names), services)
+    
+    with gr.Blocks(title=S["title"]) as demo:
+        gr.Markdown(S["header"])
+        gr.Markdown(S["description"])
         
         with gr.Row():
             # Input column
             with gr.Column():
-                gr.Markdown("### メール入力")
-                user_id = gr.Textbox(label="ユーザーID", value="user123", info="メモリの名前空間に使用されます")
-                author = gr.Textbox(label="差出人", placeholder="例: 田中花子 <hanako.tanaka@company.com>")
-                to = gr.Textbox(label="宛先", placeholder="例: 鈴木一郎 <ichiro.suzuki@company.com>")
-                subject = gr.Textbox(label="件名", placeholder="APIドキュメントについての質問")
-                email_body = gr.Textbox(label="メール本文", lines=10, placeholder="鈴木様\n\nAPIドキュメントを確認していたのですが...\n\n田中")
-                process_button = gr.Button("メールを処理", variant="primary")
+                gr.Markdown(S["sections"]["email_input"])
+                user_id = gr.Textbox(label=S["labels"]["user_id"], value=DEFAULT_USER_ID, info=S["info"]["user_id"])
+                author = gr.Textbox(label=S["labels"]["author"], placeholder=S["placeholders"]["author"])
+                to = gr.Textbox(label=S["labels"]["to"], placeholder=S["placeholders"]["to"])
+                subject = gr.Textbox(label=S["labels"]["subject"], placeholder=S["placeholders"]["subject"])
+                email_body = gr.Textbox(label=S["labels"]["email_body"], lines=10, placeholder=S["placeholders"]["email_body"])
+                process_button = gr.Button(S["buttons"]["process"], variant="primary")
             
             # Output column
             with gr.Column():
-                gr.Markdown("### メール分析")
-                classification_output = gr.Markdown(label="分類結果")
-                chatbot_output = gr.Chatbot(label="エージェントとのやりとり", height=400, type="messages")
+                gr.Markdown(S["sections"]["email_analysis"])
+                classification_output = gr.Markdown(label=S["labels"]["classification"])
+                chatbot_output = gr.Chatbot(label=S["labels"]["chatbot"], height=400, type="messages")
                 
-                with gr.Accordion("フィードバックと最適化", open=False):
-                    gr.Markdown("返答に対するフィードバックを提供して、アシスタントの改善に協力してください：")
+                with gr.Accordion(S["sections"]["feedback"], open=False):
+                    gr.Markdown(S["sections"]["feedback_description"])
                     feedback_input = gr.Textbox(
-                        label="フィードバック", 
-                        placeholder="例: 'メールの最後は必ず「鈴木一郎」と署名してください' または 'marketing@company.comからのメールは無視してください' または 'build@company.comからのメールは無視してください'",
+                        label=S["labels"]["feedback"],
+                        placeholder=S["placeholders"]["feedback"],
                         lines=2
                     )
-                    feedback_button = gr.Button("フィードバックを送信して最適化", variant="secondary")
-                    optimization_result = gr.Markdown(label="最適化結果")
+                    feedback_button = gr.Button(S["buttons"]["feedback"], variant="secondary")
+                    optimization_result = gr.Markdown(label=S["labels"]["optimization_result"])
         
         # Set up state for storing messages
-        saved_messages_state = gr.State([])
+        saved_messages_state = gr.State({"raw_len": 0, "formatted": []})
         
-        # Function to process email and save messages
-        def process_and_save_messages(user_id, author, to, subject, email_body):
-            classification, messages = process_email(
-                email_agent, store, llm, user_id, author, to, subject, email_body
-            )
-            return classification, messages, messages
+        # Function to process email and save messages, streaming partial results
+        async def process_and_save_messages(user_id, author, to, subject, email_body):
+            agent, store, llm, response_cache = await resolve("agent", "store", "llm", "response_cache")
+            async for classification, messages_state in process_email(
+                agent, store, llm, user_id, author, to, subject, email_body, response_cache
+            ):
+                yield classification, messages_state["formatted"], messages_state
         
         # Connect the button to the processing function that saves messages
         process_button.click(
             process_and_save_messages,
             inputs=[user_id, author, to, subject, email_body],
-            outputs=[classification_output, chatbot_output, saved_messages_state]
+            outputs=[classification_output, chatbot_output, saved_messages_state],
+            queue=True
+        )
+        
+        # Batched variant for API clients submitting bursts of emails;
+        # the queue groups concurrent requests into a single abatch call
+        async def process_batch(user_ids, authors, tos, subjects, email_bodies):
+            agent, store = await resolve("agent", "store")
+            classifications, messages_states = await process_email_batch(
+                agent, store, user_ids, authors, tos, subjects, email_bodies
+            )
+            return classifications, [state["formatted"] for state in messages_states], messages_states
+        
+        batch_button = gr.Button(visible=False)
+        batch_button.click(
+            process_batch,
+            inputs=[user_id, author, to, subject, email_body],
+            outputs=[classification_output, chatbot_output, saved_messages_state],
+            api_name="process_batch",
+            batch=True,
+            max_batch_size=get_settings().default_concurrency
         )
         
         # Function to handle feedback and optimize prompts
-        def handle_feedback(user_id, messages, feedback):
-            return optimize_prompts(store, llm, user_id, messages, feedback)
+        async def handle_feedback(user_id, messages_state, chatbot_messages, feedback):
+            store, llm, response_cache = await resolve("store", "llm", "response_cache")
+            if response_cache is not None:
+                response_cache.invalidate(user_id)
+            # Fall back to the messages shown in the chatbot when nothing has
+            # been processed in this session yet
+            messages = messages_state["formatted"] or chatbot_messages
+            return await asyncio.to_thread(
+                optimize_prompts, store, llm, user_id, messages, feedback
+            )
         
         # Connect the feedback button to the optimization function
         feedback_button.click(
             handle_feedback,
-            inputs=[user_id, saved_messages_state, feedback_input],
+            inputs=[user_id, saved_messages_state, chatbot_output, feedback_input],
             outputs=[optimization_result]
         )
         
         # Add tabs for main interface and prompt editing
         with gr.Tabs():
-            with gr.TabItem("メール処理"):
-                gr.Markdown("上記がメイン処理画面です。")
+            with gr.TabItem(S["sections"]["process_tab"]):
+                gr.Markdown(S["sections"]["process_tab_description"])
                 
-            with gr.TabItem("プロンプト管理"):
-                gr.Markdown("### プロンプトの閲覧と編集")
-                gr.Markdown("メールアシスタントで使用されるプロンプトをカスタマイズできます。")
+            with gr.TabItem(S["sections"]["prompts_tab"]):
+                gr.Markdown(S["sections"]["prompts_header"])
+                gr.Markdown(S["sections"]["prompts_description"])
                 
-                prompt_user_id = gr.Textbox(label="ユーザーID", value="user123", info="プロンプトを読み込み/保存するユーザーIDを入力してください")
-                load_prompts_btn = gr.Button("プロンプトを読み込む")
+                prompt_user_id = gr.Textbox(label=S["labels"]["user_id"], value=DEFAULT_USER_ID, info=S["info"]["prompt_user_id"])
+                load_prompts_btn = gr.Button(S["buttons"]["load_prompts"])
                 
-                main_agent_prompt = gr.TextArea(label="メインエージェントの指示", lines=5, placeholder="メインエージェントへの指示...")
-                ignore_prompt_input = gr.TextArea(label="振り分け - 無視ルール", lines=5, placeholder="メールを無視するためのルール...")
-                notify_prompt_input = gr.TextArea(label="振り分け - 通知ルール", lines=5, placeholder="メール通知のルール...")
-                respond_prompt_input = gr.TextArea(label="振り分け - 返信ルール", lines=5, placeholder="メールに返信するためのルール...")
+                main_agent_prompt = gr.TextArea(label=S["labels"]["main_agent_prompt"], lines=5, placeholder=S["placeholders"]["main_agent_prompt"])
+                ignore_prompt_input = gr.TextArea(label=S["labels"]["ignore_prompt"], lines=5, placeholder=S["placeholders"]["ignore_prompt"])
+                notify_prompt_input = gr.TextArea(label=S["labels"]["notify_prompt"], lines=5, placeholder=S["placeholders"]["notify_prompt"])
+                respond_prompt_input = gr.TextArea(label=S["labels"]["respond_prompt"], lines=5, placeholder=S["placeholders"]["respond_prompt"])
                 
-                save_prompts_btn = gr.Button("プロンプトを保存", variant="primary")
+                save_prompts_btn = gr.Button(S["buttons"]["save_prompts"], variant="primary")
                 prompt_status = gr.Markdown()
                 
                 # Function to handle prompt loading
-                def handle_load_prompts(user_id):
-                    return load_prompts(store, user_id)
+                async def handle_load_prompts(user_id):
+                    store = await resolve("store")
+                    return await asyncio.to_thread(load_prompts, store, user_id)
                 
                 # Function to handle prompt saving
-                def handle_save_prompts(user_id, main_prompt, ignore_prompt, notify_prompt, respond_prompt):
-                    return save_prompts(store, user_id, main_prompt, ignore_prompt, notify_prompt, respond_prompt)
+                async def handle_save_prompts(user_id, main_prompt, ignore_prompt, notify_prompt, respond_prompt):
+                    store, response_cache = await resolve("store", "response_cache")
+                    if response_cache is not None:
+                        response_cache.invalidate(user_id)
+                    return await asyncio.to_thread(
+                        save_prompts, store, user_id, main_prompt, ignore_prompt, notify_prompt, respond_prompt
+                    )
                 
                 # Connect the load button
                 load_prompts_btn.click(
                     handle_load_prompts,
                     inputs=[prompt_user_id],
-                    outputs=[main_agent_prompt, ignore_prompt_input, notify_prompt_input, respond_prompt_input]
+                    outputs=[main_agent_prompt, ignore_prompt_input, notify_prompt_input, respond_prompt_input],
+                    queue=False
                 )
                 
                 # Connect the save button
                 save_prompts_btn.click(
                     handle_save_prompts,
                     inputs=[prompt_user_id, main_agent_prompt, ignore_prompt_input, notify_prompt_input, respond_prompt_input],
-                    outputs=[prompt_status]
+                    outputs=[prompt_status],
+                    queue=False
                 )
         
-        # Add example inputs
+        # Add example inputs; results are not cached since they depend on the
+        # user's editable prompts
         gr.Examples(
-            [
-                [
-                    "user123",
-                    "田中花子 <hanako.tanaka@company.com>",
-                    "鈴木一郎 <ichiro.suzuki@company.com>",
-                    "プロジェクト状況について",
-                    "鈴木様\n\n明日、プロジェクトの状況について簡単に打ち合わせできますでしょうか？\n\nよろしくお願いいたします。\n田中"
-                ],
-                [
-                    "user123",
-                    "マーケティングチーム <marketing@company.com>",
-                    "全社員 <all-staff@company.com>",
-                    "【お知らせ】来週の新製品発表について",
-                    "皆様\n\n来週金曜日14時から新製品発表会を開催いたします。ぜひご参加ください。\n\n以上\nマーケティングチーム"
-                ],
-                [
-                    "user123",
-                    "ビルドシステム <build@company.com>",
-                    "エンジニアリング <engineering@company.com>",
-                    "【警告】mainブランチのビルド失敗",
-                    "ビルド #4592 がmainブランチで失敗しました。\n\n原因: 認証モジュールの単体テスト失敗\nログ詳細: https://build.company.com/4592"
-                ]
-            ],
+            S["examples"],
             inputs=[user_id, author, to, subject, email_body]
         )
+    
+    # Async generators are multiplexed on the event loop by the queue;
+    # LLM-backed events run in parallel up to the configured limit, and API
+    # clients cannot bypass the queue through the direct REST routes
+    demo.queue(
+        default_concurrency_limit=get_settings().default_concurrency,
+        max_size=QUEUE_MAX_SIZE,
+        status_update_rate=1.0,
+        api_open=False
+    )
         
     return demo
\ No newline at end of file
@@ -10,17 +10,111 @@ application-wide settings.
 """
 
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
 
-# Azure OpenAI API settings
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME")
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """
+    Environment-derived settings, read once per process.
+    """
+    
+    # Azure OpenAI API settings
+    azure_openai_endpoint: str | None
+    azure_openai_api_key: str | None
+    azure_openai_deployment_name: str | None
+    azure_openai_api_version: str | None
+    azure_openai_embedding_deployment_name: str | None
+    
+    # Shortened embedding size for text-embedding-3 models (None keeps the model's full size)
+    embedding_dimensions: int | None
+    
+    # Optional smaller chat deployment that triages first; low-confidence results
+    # are escalated to the main deployment
+    azure_openai_router_deployment_name: str | None
+    router_confidence_threshold: float
+    
+    # Triage with a label-only schema (no reasoning) unless a run sets configurable.explain
+    triage_label_only: bool
+    
+    # Gradio queue concurrency (tune to the Azure OpenAI rate limits of the deployment)
+    default_concurrency: int
+    
+    # Minimum cosine similarity for reusing a cached response to a near-duplicate email
+    semantic_cache_threshold: float
+    
+    # Provider-side prompt caching: when enabled, static system prompt blocks are sent
+    # as structured content marked with Anthropic-style cache_control breakpoints.
+    # Azure OpenAI caches byte-identical prompt prefixes automatically, so this is
+    # off by default (structured content also requires a recent API version).
+    prompt_cache_control: bool
+    
+    # Send an OpenAI prompt_cache_key with triage calls so requests sharing a user's
+    # system prompt are routed to the same prefix cache (requires a recent API version)
+    prompt_cache_key: bool
+    
+    # Interface language ("ja" or "en")
+    locale: str
+    
+    # File the memory store is saved to on exit and loaded from on start (None keeps it in memory only)
+    memory_store_path: str | None
+    
+    # Store memory index vectors as int8 codes (about 4x smaller, slightly lower recall)
+    memory_index_int8: bool
+    
+    # Triage micro-batching: concurrent emails of one user are classified in a single
+    # router call of up to this many emails (1 disables batching), collected for up
+    # to triage_batch_window_ms after the first arrival
+    triage_batch_size: int
+    triage_batch_window_ms: int
+    
+    # Ignore mailing-list mail without calling the LLM (off by default, since it
+    # overrides the user's triage instructions)
+    triage_rules: bool
+    
+    # Sender domains whose emails are always ignored (comma-separated in TRIAGE_IGNORE_DOMAINS)
+    triage_ignore_domains: frozenset
+
+
+@lru_cache(maxsize=1)
+def get_settings():
+    """
+    Load environment variables (including the .env file) and build the settings.
+    
+    The result is cached, so the .env file and the environment are only read once.
+    
+    Returns:
+        Settings: The application settings.
+    """
+    load_dotenv()
+    env = os.environ
+    return Settings(
+        azure_openai_endpoint=env.get("AZURE_OPENAI_ENDPOINT"),
+        azure_openai_api_key=env.get("AZURE_OPENAI_API_KEY"),
+        azure_openai_deployment_name=env.get("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        azure_openai_api_version=env.get("AZURE_OPENAI_API_VERSION"),
+        azure_openai_embedding_deployment_name=env.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME"),
+        embedding_dimensions=int(env["EMBEDDING_DIMENSIONS"]) if env.get("EMBEDDING_DIMENSIONS") else None,
+        azure_openai_router_deployment_name=env.get("AZURE_OPENAI_ROUTER_DEPLOYMENT_NAME") or None,
+        router_confidence_threshold=float(env.get("ROUTER_CONFIDENCE_THRESHOLD", "0.8")),
+        triage_label_only=env.get("TRIAGE_LABEL_ONLY", "false").lower() == "true",
+        default_concurrency=int(env.get("DEFAULT_CONCURRENCY", "8")),
+        semantic_cache_threshold=float(env.get("SEMANTIC_CACHE_THRESHOLD", "0.97")),
+        prompt_cache_control=env.get("PROMPT_CACHE_CONTROL", "false").lower() == "true",
+        prompt_cache_key=env.get("PROMPT_CACHE_KEY", "false").lower() == "true",
+        locale=env.get("LOCALE", "ja"),
+        memory_store_path=env.get("MEMORY_STORE_PATH") or None,
+        memory_index_int8=env.get("MEMORY_INDEX_INT8", "true").lower() == "true",
+        triage_batch_size=int(env.get("TRIAGE_BATCH_SIZE", "1")),
+        triage_batch_window_ms=int(env.get("TRIAGE_BATCH_WINDOW_MS", "20")),
+        triage_rules=env.get("TRIAGE_RULES", "false").lower() == "true",
+        triage_ignore_domains=frozenset(
+            domain.strip().lower() for domain in env.get("TRIAGE_IGNORE_DOMAINS", "").split(",") if domain.strip()
+        ),
+    )
+
 
 # Check for required environment variables
 def validate_env_vars():
@@ -30,14 +124,15 @@ def validate_env_vars():
     Raises:
         ValueError: If any required environment variables are missing.
     """
-    required_vars = [
-        "AZURE_OPENAI_ENDPOINT",
-        "AZURE_OPENAI_API_KEY",
-        "AZURE_OPENAI_DEPLOYMENT_NAME",
-        "AZURE_OPENAI_API_VERSION"
-    ]
+    settings = get_settings()
+    required_vars = {
+        "AZURE_OPENAI_ENDPOINT": settings.azure_openai_endpoint,
+        "AZURE_OPENAI_API_KEY": settings.azure_openai_api_key,
+        "AZURE_OPENAI_DEPLOYMENT_NAME": settings.azure_openai_deployment_name,
+        "AZURE_OPENAI_API_VERSION": settings.azure_openai_api_version
+    }
     
-    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    missing_vars = [var for var, value in required_vars.items() if not value]
     
     if missing_vars:
         raise ValueError(
@@ -62,8 +157,42 @@ PROMPT_INSTRUCTIONS = {
     "agent_instructions": "Use these tools when appropriate to help manage John's tasks efficiently."
 }
 
+def build_cached_system_message(static_blocks, dynamic_block=""):
+    """
+    Build a system message whose static blocks can be cached by the provider.
+    
+    Static blocks are always placed first so the prompt prefix stays byte-stable
+    across requests; the request-specific block is appended last.
+    
+    Args:
+        static_blocks: Prompt blocks that rarely change (instructions, rules).
+        dynamic_block: Request-specific trailing block (e.g. few-shot examples).
+        
+    Returns:
+        SystemMessage: The system message.
+    """
+    from langchain_core.messages import SystemMessage
+    
+    if not get_settings().prompt_cache_control:
+        return SystemMessage(content="".join(static_blocks) + dynamic_block)
+    
+    content = [
+        {"type": "text", "text": block, "cache_control": {"type": "ephemeral"}}
+        for block in static_blocks
+    ]
+    if dynamic_block:
+        content.append({"type": "text", "text": dynamic_block})
+    return SystemMessage(content=content)
+
+
 # Default server settings
 DEFAULT_PORT = 7860
 
+# User ID prefilled in the interface
+DEFAULT_USER_ID = "user123"
+
+# Maximum number of pending requests in the Gradio queue
+QUEUE_MAX_SIZE = 64
+
 # Logging settings
 LOG_DIR = "logs"
\ No newline at end of file
@@ -8,9 +8,12 @@ This module defines the data models, types, and schemas used throughout the appl
 including the Router model for email classification and State type for managing application state.
 """
 
+import threading
+from typing import ClassVar
 from typing_extensions import TypedDict, Literal, Annotated, NotRequired
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from langgraph.graph import add_messages
+from langgraph.prebuilt.chat_agent_executor import AgentState
 
 
 class Router(BaseModel):
@@ -18,9 +21,12 @@ class Router(BaseModel):
     Model for analyzing and classifying emails.
     
     This model is used with the LLM to define the expected output structure
-    for email classification decisions.
+    for email classification decisions. Instances are immutable so parsed
+    results can be shared safely between cached requests.
     """
 
+    model_config = ConfigDict(frozen=True, validate_assignment=False, extra="ignore")
+
     reasoning: str = Field(
         description="Step-by-step reasoning behind the classification."
     )
@@ -31,6 +37,143 @@ class Router(BaseModel):
     )
 
 
+class TriageLabel(BaseModel):
+    """
+    Label-only model for classifying emails.
+    
+    Requests just the classification from the LLM, so the router emits a few
+    tokens instead of its reasoning. ``reasoning`` is a class attribute, not a
+    field, so results can be handled like Router results.
+    """
+
+    model_config = ConfigDict(frozen=True, validate_assignment=False, extra="ignore")
+
+    reasoning: ClassVar[str] = ""
+    classification: Literal["ignore", "respond", "notify"] = Field(
+        description="The classification of an email: 'ignore' for irrelevant emails, "
+        "'notify' for important information that doesn't need a response, "
+        "'respond' for emails that need a reply",
+    )
+
+
+class ScoredRouter(Router):
+    """
+    Router output that also reports how confident the model is.
+    
+    Used by the small model of the triage cascade to decide whether the
+    classification should be escalated to the main model.
+    """
+
+    confidence: float = Field(
+        description="Confidence in the classification, from 0.0 (guess) to 1.0 (certain)."
+    )
+
+
+class ScoredTriageLabel(TriageLabel):
+    """
+    Label-only output of the small model of the triage cascade.
+    
+    Reports the model's confidence with the label, so label-only runs can be
+    escalated to the main model like ScoredRouter results.
+    """
+
+    confidence: float = Field(
+        description="Confidence in the classification, from 0.0 (guess) to 1.0 (certain)."
+    )
+
+
+# Number of the email a batched decision is for, as enumerated in the prompt
+_EMAIL_INDEX_DESCRIPTION = "The number of the email this decision is for, as given in its EMAIL header."
+
+
+class RouterDecision(Router):
+    """
+    Classification of one email of a batch, tagged with the email's number.
+    """
+
+    index: int = Field(description=_EMAIL_INDEX_DESCRIPTION)
+
+
+class TriageLabelDecision(TriageLabel):
+    """
+    Label of one email of a batch, tagged with the email's number.
+    """
+
+    index: int = Field(description=_EMAIL_INDEX_DESCRIPTION)
+
+
+class ScoredRouterDecision(ScoredRouter):
+    """
+    Scored classification of one email of a batch, tagged with the email's number.
+    """
+
+    index: int = Field(description=_EMAIL_INDEX_DESCRIPTION)
+
+
+class ScoredTriageLabelDecision(ScoredTriageLabel):
+    """
+    Scored label of one email of a batch, tagged with the email's number.
+    """
+
+    index: int = Field(description=_EMAIL_INDEX_DESCRIPTION)
+
+
+class RouterBatch(BaseModel):
+    """
+    Model for classifying several emails in a single LLM call.
+    
+    Each decision carries the number of its email, so decisions are matched
+    to emails even when the model reorders or drops some of them.
+    """
+
+    model_config = ConfigDict(frozen=True, validate_assignment=False, extra="ignore")
+
+    decisions: list[RouterDecision] = Field(
+        description="One classification per email, each tagged with the email's number."
+    )
+
+
+class TriageLabelBatch(BaseModel):
+    """
+    Label-only model for classifying several emails in a single LLM call.
+    
+    Each label carries the number of its email.
+    """
+
+    model_config = ConfigDict(frozen=True, validate_assignment=False, extra="ignore")
+
+    decisions: list[TriageLabelDecision] = Field(
+        description="One classification per email, each tagged with the email's number."
+    )
+
+
+class ScoredRouterBatch(BaseModel):
+    """
+    Batch output of the small model of the triage cascade.
+    
+    Each decision carries the model's confidence, so that the batch can be
+    escalated to the main model when any of them is unsure.
+    """
+
+    model_config = ConfigDict(frozen=True, validate_assignment=False, extra="ignore")
+
+    decisions: list[ScoredRouterDecision] = Field(
+        description="One classification per email, each tagged with the email's number."
+    )
+
+
+class ScoredTriageLabelBatch(BaseModel):
+    """
+    Label-only batch output of the small model of the triage cascade.
+    """
+
+    model_config = ConfigDict(frozen=True, validate_assignment=False, extra="ignore")
+
+    decisions: list[ScoredTriageLabelDecision] = Field(
+        description="One classification per email, each tagged with the email's number."
+    )
+
+
 class State(TypedDict):
     """
     Application state type definition for the LangGraph state management.
@@ -43,6 +186,20 @@ class State(TypedDict):
     messages: Annotated[list, add_messages]
     classification: NotRequired[str]  # To store email classification result
     reasoning: NotRequired[str]  # To store reasoning behind the classification
+    triage_prompt_cached: NotRequired[tuple]  # Pre-rendered static triage prompt blocks
+    agent_prompt_cached: NotRequired[str]  # Pre-rendered response agent system prompt
+    email_embedding: NotRequired[list]  # Embedding of the email, computed once per run
+
+
+class ResponseAgentState(AgentState):
+    """
+    State type for the response agent.
+    
+    Extends the ReAct agent state so the pre-rendered system prompt is passed
+    through from the main graph state.
+    """
+    
+    agent_prompt_cached: NotRequired[str]
 
 
 class EmailInput(TypedDict):
@@ -56,4 +213,49 @@ class EmailInput(TypedDict):
     author: str  # Sender's email address and name
     to: str  # Recipient's email address and name
     subject: str  # Email subject line
-    email_thread: str  # Full email content/thread
\ No newline at end of file
+    email_thread: str  # Full email content/thread
+
+
+class LazyServices:
+    """
+    Long-lived objects shared by the web interface event handlers, built on
+    first use instead of at startup.
+    
+    Each service is produced by a zero-argument factory the first time it is
+    read and kept afterwards, so the interface can be served while the store,
+    memory tools and agent are still being constructed. Each service has its
+    own lock, so reading one service does not wait for another to be built.
+    A factory that raises is retried on the next read.
+    """
+    
+    def __init__(self, **factories):
+        """
+        Initialize the lazy services.
+        
+        Args:
+            **factories: Factory per service name (agent, store, llm, response_cache).
+        """
+        self._factories = factories
+        self._locks = {name: threading.RLock() for name in factories}
+    
+    def __getattr__(self, name):
+        # Only called for services that have not been built yet
+        factories = self.__dict__.get("_factories", {})
+        if name not in factories:
+            raise AttributeError(name)
+        with self._locks[name]:
+            if name not in self.__dict__:
+                self.__dict__[name] = factories[name]()
+        return self.__dict__[name]
+    
+    def built(self, *names):
+        """
+        Check whether services have already been built.
+        
+        Args:
+            *names: Service names.
+            
+        Returns:
+            bool: True if reading every named service returns without building it.
+        """
+        return all(name in self.__dict__ for name in names)
@@ -8,6 +8,36 @@ This module defines all the prompt templates used throughout the application,
 including system prompts for the agent and triage components.
 """
 
+from string import Formatter
+
+
+def compile_template(template):
+    """
+    Compile a ``str.format`` template into a function that renders it as an f-string.
+    
+    The template is parsed once, when it is compiled, instead of by every
+    ``str.format`` call. Only plain ``{name}`` fields are supported.
+    
+    Args:
+        template: Template string using ``str.format`` syntax.
+        
+    Returns:
+        callable: Function taking the fields as keyword arguments and
+            returning the rendered string.
+    """
+    fields = []
+    for _, field, spec, conversion in Formatter().parse(template):
+        if field is None:
+            continue
+        if not field.isidentifier() or spec or conversion:
+            raise ValueError(f"Unsupported template field: {field!r}")
+        if field not in fields:
+            fields.append(field)
+    if not fields:
+        return lambda: template
+    return eval(f"lambda *, {', '.join(fields)}: f{template!r}")
+
+
 # Agent prompt baseline 
 agent_system_prompt = """
 < Role >
@@ -54,8 +84,9 @@ You have access to the following tools to help manage {name}'s communications an
 </ Instructions >
 """
 
-# Triage prompt
-triage_system_prompt = """
+# Triage prompt, split into blocks so that each triage rule can be cached
+# separately by the provider and edits only invalidate the touched block
+triage_system_prompt_header = """
 < Role >
 You are {full_name}'s executive assistant. You are a top-notch executive assistant who cares about {name} performing as well as possible.
 </ Role >
@@ -76,26 +107,68 @@ Classify the below email into one of these categories.
 
 </ Instructions >
 
-< Rules >
+"""
+
+triage_rules_ignore_prompt = """< Rules >
 Emails that are not worth responding to:
 {triage_no}
+"""
 
+triage_rules_notify_prompt = """
 There are also other things that {name} should know about, but don't require an email response. For these, you should notify {name} (using the `notify` response). Examples of this include:
 {triage_notify}
+"""
 
+triage_rules_respond_prompt = """
 Emails that are worth responding to:
 {triage_email}
 </ Rules >
+"""
 
+triage_examples_prompt = """
 < Few shot examples >
 {examples}
 </ Few shot examples >
 """
 
+triage_system_prompt = (
+    triage_system_prompt_header
+    + triage_rules_ignore_prompt
+    + triage_rules_notify_prompt
+    + triage_rules_respond_prompt
+    + triage_examples_prompt
+)
+
 triage_user_prompt = """
 Please determine how to handle the below email thread:
 
 From: {author}
 To: {to}
 Subject: {subject}
-{email_thread}"""
\ No newline at end of file
+{email_thread}"""
+
+# Batched triage: the emails are enumerated in one user message
+triage_batch_user_prompt = """
+Please determine how to handle each of the {count} email threads below.
+Return exactly one decision per email, tagged with the email's number.
+{emails}"""
+
+triage_batch_email_prompt = """
+--- EMAIL {index} ---
+From: {author}
+To: {to}
+Subject: {subject}
+{email_thread}"""
+
+# Renderers for the templates filled in for every email
+render_triage_examples_prompt = compile_template(triage_examples_prompt)
+render_triage_user_prompt = compile_template(triage_user_prompt)
+render_triage_batch_user_prompt = compile_template(triage_batch_user_prompt)
+render_triage_batch_email_prompt = compile_template(triage_batch_email_prompt)
+
+conversation_summary_prompt = """
+Summarize the conversation below between an executive assistant and the tools it used.
+Keep every fact, decision, commitment and open question that later turns may depend on.
+When a summary of earlier turns is given first, extend it with the turns that follow.
+Reply with the summary only.
+"""
@@ -9,68 +9,285 @@ setting up the language models, memory store, graph workflow, and web interface.
 """
 
 import argparse
+import atexit
+import threading
 import sys
 import socket
 
-from dotenv import load_dotenv
-from langchain_openai import AzureChatOpenAI
-from langgraph.store.memory import InMemoryStore
+# The LangChain, LangGraph and Gradio stacks are imported inside the functions
+# that use them, so argument parsing and the port check start instantly
+from src.core.config import DEFAULT_PORT, DEFAULT_USER_ID, LOG_DIR, get_settings, validate_env_vars
+from src.utils.cache import once
+from src.utils.logger import EmailAssistantLogger, info, warning
 
-from src.app.interface import create_gradio_interface
-from src.core.config import (
-    AZURE_OPENAI_DEPLOYMENT_NAME,
-    AZURE_OPENAI_API_VERSION,
-    AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME,
-    DEFAULT_PORT,
-    validate_env_vars
-)
-from src.workflow.graph import create_workflow
-from src.tools.memory import create_memory_tools
-from src.core.models import Router
-from src.utils.logger import EmailAssistantLogger, info
 
+def setup_router_language_model():
+    """
+    Initialize the smaller chat model that triages first, if one is configured.
+    
+    Returns:
+        AzureChatOpenAI | None: The router deployment, or None when
+            AZURE_OPENAI_ROUTER_DEPLOYMENT_NAME is not set.
+    """
+    from langchain_openai import AzureChatOpenAI
+    
+    settings = get_settings()
+    if not settings.azure_openai_router_deployment_name:
+        return None
+    return AzureChatOpenAI(
+        azure_deployment=settings.azure_openai_router_deployment_name,
+        openai_api_version=settings.azure_openai_api_version,
+        temperature=0,
+    )
 
-def setup_language_models():
+
+def with_router_cascade(llm, llm_small, schema, scored_schema):
+    """
+    Bind a triage schema, letting the small model classify first when given.
+    
+    Args:
+        llm: Main language model instance.
+        llm_small: Small language model instance, or None.
+        schema: Pydantic model describing the main model's output.
+        scored_schema: Pydantic model describing the small model's output,
+            with a confidence per decision.
+        
+    Returns:
+        Runnable: The router, as a RouterCascade when a small model is given.
+    """
+    from src.workflow.triage import RouterCascade
+    
+    llm_router = llm.with_structured_output(schema)
+    if llm_small is None:
+        return llm_router
+    return RouterCascade(
+        llm_small.with_structured_output(scored_schema),
+        llm_router,
+        schema,
+        threshold=get_settings().router_confidence_threshold
+    )
+
+
+def setup_language_models(llm_small=None):
     """
     Initialize and configure the language models.
     
+    Args:
+        llm_small: Optional smaller chat model that triages first.
+        
     Returns:
         tuple: (llm, llm_router) - Language models for general use and structured output.
     """
+    from langchain_openai import AzureChatOpenAI
+    from src.core.models import Router, ScoredRouter
+    
+    settings = get_settings()
+    
     # Instantiate the Azure Chat Model
     llm = AzureChatOpenAI(
-        azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME, 
-        openai_api_version=AZURE_OPENAI_API_VERSION,   
+        azure_deployment=settings.azure_openai_deployment_name, 
+        openai_api_version=settings.azure_openai_api_version,   
         temperature=0, 
     )
     
     # Create a variant with structured output for the router
-    llm_router = llm.with_structured_output(Router)
+    llm_router = with_router_cascade(llm, llm_small, Router, ScoredRouter)
     
     return llm, llm_router
 
 
-def setup_memory_store():
+def setup_embeddings():
+    """
+    Initialize the embedding model shared by the memory store and response cache.
+    
+    Returns:
+        CachedEmbeddings: Azure OpenAI embeddings behind an in-process LRU cache.
+    """
+    from langchain_openai import AzureOpenAIEmbeddings
+    from src.memory.embeddings import CachedEmbeddings
+    
+    settings = get_settings()
+    
+    return CachedEmbeddings(
+        AzureOpenAIEmbeddings(
+            azure_deployment=settings.azure_openai_embedding_deployment_name,
+            openai_api_version=settings.azure_openai_api_version,
+            dimensions=settings.embedding_dimensions,
+            chunk_size=16,
+            max_retries=6,
+        ),
+        maxsize=4096
+    )
+
+
+def setup_memory_store(embeddings):
     """
     Initialize the memory store with embedding configuration.
     
+    Args:
+        embeddings: Embedding model used to index and search memories.
+        
     Returns:
-        InMemoryStore: Configured memory store instance.
+        HNSWBackedStore: Configured memory store instance, loaded from and
+            saved back to MEMORY_STORE_PATH when it is set.
     """
-    # Create an InMemoryStore with Azure OpenAI embeddings
-    store = InMemoryStore(
-        index={"embed": f"azure_openai:{AZURE_OPENAI_EMBEDDING_DEPLOYMENT_NAME}"}
+    from src.memory.vector_store import HNSWBackedStore
+    
+    settings = get_settings()
+    
+    # Create an ANN-indexed store with Azure OpenAI embeddings
+    index = {"embed": embeddings}
+    if settings.embedding_dimensions:
+        index["dims"] = settings.embedding_dimensions
+    store = HNSWBackedStore(
+        index=index,
+        path=settings.memory_store_path,
+        m=32,
+        ef_construction=100,
+        # A wider search compensates for the recall lost to int8 quantization
+        ef_search=96 if settings.memory_index_int8 else 64,
+        quantize=settings.memory_index_int8
     )
     
+    # Persist the memory on shutdown
+    if settings.memory_store_path:
+        atexit.register(store.save)
+    
     return store
 
 
-def find_available_port(preferred_port):
+def setup_response_cache(embeddings):
+    """
+    Initialize the semantic response cache.
+    
+    Args:
+        embeddings: Embedding model used to match near-duplicate emails.
+        
+    Returns:
+        ResponseCache: Cache matching near-duplicate emails by embedding
+            similarity, or by exact text when no embedding deployment is set.
+    """
+    from src.memory.response_cache import ResponseCache
+    
+    settings = get_settings()
+    
+    if not settings.azure_openai_embedding_deployment_name:
+        embeddings = None
+    
+    return ResponseCache(embeddings, threshold=settings.semantic_cache_threshold)
+
+
+# Cached constructors; each component is built once, on first use, even when
+# the prewarm thread and a request ask for it at the same time
+
+@once
+def _get_router_language_model():
+    return setup_router_language_model()
+
+
+@once
+def _get_language_models():
+    return setup_language_models(_get_router_language_model())
+
+
+@once
+def _get_embeddings():
+    return setup_embeddings()
+
+
+@once
+def _get_store():
+    return setup_memory_store(_get_embeddings())
+
+
+@once
+def _get_memory_tools():
+    from src.tools.memory import create_memory_tools
+    
+    # Create memory tools with namespacing
+    return create_memory_tools((
+        "email_assistant", 
+        "{langgraph_user_id}",
+        "collection"
+    ))
+
+
+@once
+def _get_agent():
+    from src.workflow.graph import create_workflow
+    
+    from src.core.models import (
+        RouterBatch, ScoredRouterBatch, ScoredTriageLabel, ScoredTriageLabelBatch,
+        TriageLabel, TriageLabelBatch,
+    )
+    
+    settings = get_settings()
+    llm, llm_router = _get_language_models()
+    llm_small = _get_router_language_model()
+    
+    # Request only the label from the router when reasoning is not needed,
+    # through the same cascade as full classifications
+    llm_router_fast = None
+    if settings.triage_label_only:
+        llm_router_fast = with_router_cascade(llm, llm_small, TriageLabel, ScoredTriageLabel)
+    
+    # Micro-batch triage calls when a batch size above one is configured, with
+    # the same cascade and label-only routing as single emails
+    llm_router_batch = llm_router_batch_fast = None
+    if settings.triage_batch_size > 1:
+        llm_router_batch = with_router_cascade(llm, llm_small, RouterBatch, ScoredRouterBatch)
+        if settings.triage_label_only:
+            llm_router_batch_fast = with_router_cascade(
+                llm, llm_small, TriageLabelBatch, ScoredTriageLabelBatch
+            )
+    
+    return create_workflow(
+        llm, llm_router, _get_store(), _get_memory_tools(),
+        llm_router_batch=llm_router_batch,
+        batch_size=settings.triage_batch_size,
+        batch_window=settings.triage_batch_window_ms / 1000,
+        llm_router_fast=llm_router_fast,
+        llm_router_batch_fast=llm_router_batch_fast
+    )
+
+
+@once
+def _get_response_cache():
+    return setup_response_cache(_get_embeddings())
+
+
+def prewarm(services):
+    """
+    Pay the cold-start costs before the first request arrives.
+    
+    Builds the lazily constructed services, opens the connections to the chat
+    and embedding deployments and seeds and caches the default user's prompts.
+    Failures are logged and otherwise ignored, since the first real request
+    will simply pay the cost instead.
+    
+    Args:
+        services: LazyServices used by the web interface.
+    """
+    from src.memory.manager import load_cached_prompts
+    
+    try:
+        services.agent
+        services.response_cache
+        services.llm.invoke("ping")
+        _get_embeddings().embed_query("ping")
+        load_cached_prompts(services.store, DEFAULT_USER_ID)
+        info("Prewarm completed")
+    except Exception as e:
+        warning(f"Prewarm failed: {e}")
+
+
+def find_available_port(preferred_port, host=None):
     """
     Find an available port starting from the preferred port.
     
     Args:
         preferred_port: The port to try first.
+        host: Host address the server will bind to, or None for Gradio's default.
         
     Returns:
         int: An available port.
@@ -78,71 +295,92 @@ def find_available_port(preferred_port):
     Raises:
         SystemExit: If no available port is found.
     """
-    def is_port_in_use(port):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            return s.connect_ex(('localhost', port)) == 0
-    
-    if not is_port_in_use(preferred_port):
-        return preferred_port
-        
-    # Try to find an available port
-    for port_offset in range(1, 10):
-        alternate_port = preferred_port + port_offset
-        if not is_port_in_use(alternate_port):
-            print(f"⚠️  Port {preferred_port} is in use, using port {alternate_port} instead.")
-            return alternate_port
+    host = host or "127.0.0.1"
+    family = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)[0][0]
+    # A failed bind leaves the socket unbound, so one socket can test every candidate
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        # The server sets SO_REUSEADDR too, so ports only held by TIME_WAIT
+        # connections of a stopped server count as free; listeners still fail
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        for port in range(preferred_port, preferred_port + 10):
+            try:
+                s.bind((host, port))
+            except OSError:
+                continue
+            if port != preferred_port:
+                print(f"⚠️  Port {preferred_port} is in use, using port {port} instead.")
+            return port
             
     print(f"❌ Error: Could not find an available port in range {preferred_port}-{preferred_port+9}.")
     print("Please specify a different port with the --port option.")
     sys.exit(1)
 
 
-def main():
-    """
-    Main function that initializes and starts the Email Assistant application.
+def run(server_port=DEFAULT_PORT, server_name=None, share=False):
     """
-    # Parse command line arguments
-    parser = argparse.ArgumentParser(description="Email Assistant Application")
-    parser.add_argument("--share", action="store_true", help="Create a shareable link (may require frpc download)")
-    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to run the Gradio app on")
-    args = parser.parse_args()
+    Build the Email Assistant and serve it, blocking the calling thread.
     
-    # Find an available port
-    port = find_available_port(args.port)
+    The server is launched from the main thread so that Gradio's event loop
+    drives the async streaming handlers directly. The models, memory store,
+    memory tools and agent are built on first use, so the interface is served
+    while a background thread constructs them.
     
-    # Load environment variables
-    load_dotenv()
+    Args:
+        server_port: Port to run the Gradio app on.
+        server_name: Host address to bind to, or None for Gradio's default.
+        share: Whether to create a shareable link.
+    """
+    from src.app.interface import create_gradio_interface
+    from src.core.models import LazyServices
     
-    # Validate required environment variables
+    # Validate required environment variables (loads the .env file once)
     validate_env_vars()
     
-    # Set up logger
-    logger = EmailAssistantLogger(log_dir="logs")
+    # Set up logger; it becomes the default logger used by the helper functions
+    EmailAssistantLogger(log_dir=LOG_DIR)
     info("Email Assistant application starting")
     
-    # Set up language models
-    llm, llm_router = setup_language_models()
+    # Defer building the models, store, tools and agent to first use
+    services = LazyServices(
+        agent=_get_agent,
+        store=_get_store,
+        llm=lambda: _get_language_models()[0],
+        response_cache=_get_response_cache
+    )
     
-    # Set up memory store
-    store = setup_memory_store()
+    # Create the Gradio interface
+    demo = create_gradio_interface(services)
     
-    # Create memory tools with namespacing
-    memory_tools = create_memory_tools((
-        "email_assistant", 
-        "{langgraph_user_id}",
-        "collection"
-    ))
+    # Build the services and warm up models and prompts while the server starts
+    threading.Thread(target=prewarm, args=(services,), daemon=True).start()
     
-    # Create the workflow graph
-    email_agent = create_workflow(llm, llm_router, store, memory_tools)
+    # Launch the demo in this thread and block until it is closed
+    print(f"Starting Email Assistant at http://{server_name or 'localhost'}:{server_port}")
+    demo.launch(
+        share=share,
+        server_name=server_name,
+        server_port=server_port,
+        prevent_thread_lock=False,
+        inbrowser=False
+    )
+
+
+def main():
+    """
+    Main function that initializes and starts the Email Assistant application.
+    """
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description="Email Assistant Application")
+    parser.add_argument("--share", action="store_true", help="Create a shareable link (may require frpc download)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to run the Gradio app on")
+    parser.add_argument("--host", default=None, help="Host address to bind to (e.g. 0.0.0.0)")
+    args = parser.parse_args()
     
-    # Create the Gradio interface
-    demo = create_gradio_interface(email_agent, store, llm)
+    # Find an available port
+    port = find_available_port(args.port, args.host)
     
-    # Launch the demo
-    print(f"Starting Email Assistant at http://localhost:{port}")
-    demo.launch(share=args.share, server_port=port)
+    run(server_port=port, server_name=args.host, share=args.share)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
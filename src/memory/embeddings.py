@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Embedding model wrappers for the Email Assistant application.
+
+This module provides an LRU cache in front of an embedding model so that
+texts embedded before (repeated emails, re-run searches, re-saved prompts)
+do not cost another round-trip to the embedding endpoint.
+"""
+
+from langchain_core.embeddings import Embeddings
+
+from src.utils.cache import TTLCache, make_key
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that memoizes vectors by a hash of the text.
+    """
+
+    def __init__(self, embeddings, maxsize=4096):
+        """
+        Initialize the wrapper.
+
+        Args:
+            embeddings: The LangChain embeddings model to delegate to.
+            maxsize: Maximum number of cached vectors.
+        """
+        self.embeddings = embeddings
+        self._cache = TTLCache(maxsize=maxsize)
+
+    def _split(self, texts):
+        keys = [make_key(text) for text in texts]
+        vectors = [self._cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        return keys, vectors, missing
+
+    def _fill(self, keys, vectors, missing, embedded):
+        for i, vector in zip(missing, embedded):
+            self._cache.put(keys[i], vector)
+            vectors[i] = vector
+
+    def embed_documents(self, texts):
+        keys, vectors, missing = self._split(texts)
+        if missing:
+            embedded = self.embeddings.embed_documents([texts[i] for i in missing])
+            self._fill(keys, vectors, missing, embedded)
+        return vectors
+
+    def embed_query(self, text):
+        key = make_key(text)
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self._cache.put(key, vector)
+        return vector
+
+    async def aembed_documents(self, texts):
+        keys, vectors, missing = self._split(texts)
+        if missing:
+            embedded = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            self._fill(keys, vectors, missing, embedded)
+        return vectors
+
+    async def aembed_query(self, text):
+        key = make_key(text)
+        vector = self._cache.get(key)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self._cache.put(key, vector)
+        return vector
@@ -8,10 +8,105 @@ This module handles memory operations, including storage and retrieval of
 prompt instructions, user preferences, and email examples.
 """
 
+import logging
+import re
+from functools import lru_cache
 from langmem import create_multi_prompt_optimizer
-from src.core.config import PROMPT_INSTRUCTIONS
+from langgraph.store.base import GetOp, PutOp
+from src.core.config import PROMPT_INSTRUCTIONS, USER_PROFILE
+from src.core.prompts import (
+    agent_system_prompt_memory,
+    triage_system_prompt_header,
+    triage_rules_ignore_prompt,
+    triage_rules_notify_prompt,
+    triage_rules_respond_prompt
+)
 import traceback
-from src.utils.logger import error
+from src.utils.cache import TTLCache
+from src.utils.logger import error, get_default_logger
+
+# Phrases neutralized in user feedback before it reaches the prompt optimizer
+_JAILBREAK_REPLACEMENTS = {
+    "ignore all previous": "consider previous",
+    "ignore previous": "consider previous",
+    "disregard": "consider"
+}
+_JAILBREAK_RE = re.compile("|".join(map(re.escape, _JAILBREAK_REPLACEMENTS)), re.IGNORECASE)
+
+# Store keys of the triage prompts, by triage category
+_TRIAGE_PROMPT_KEYS = {
+    "ignore": "triage_ignore",
+    "notify": "triage_notify",
+    "respond": "triage_respond"
+}
+
+# Store keys of the prompts handled by the prompt optimizer, by optimizer prompt name
+_NAME_TO_KEY = {
+    "main_agent": "agent_instructions",
+    "triage-ignore": "triage_ignore",
+    "triage-notify": "triage_notify",
+    "triage-respond": "triage_respond"
+}
+
+# The response agent prompt with the user profile filled in once, split
+# around the per-user instructions
+_AGENT_PROMPT_HEAD, _AGENT_PROMPT_TAIL = (
+    part.format_map({"profile": USER_PROFILE["user_profile_background"], **USER_PROFILE})
+    for part in agent_system_prompt_memory.split("{instructions}")
+)
+
+# The triage prompt header only depends on the user profile, so it is filled in once
+_TRIAGE_PROMPT_HEADER = triage_system_prompt_header.format_map(USER_PROFILE)
+
+# Per-user prompts read from the store; entries are dropped whenever the
+# prompts are written and expire in case another process updates the store
+_PROMPT_CACHE = TTLCache(maxsize=1024, ttl=300)
+
+
+def invalidate_prompt_cache(store, user_id):
+    """
+    Drop a user's cached prompts so the next read goes to the store.
+    
+    Args:
+        store: Memory store instance.
+        user_id: User ID for namespacing.
+    """
+    _PROMPT_CACHE.pop((id(store), user_id, "triage"))
+    _PROMPT_CACHE.pop((id(store), user_id, "agent"))
+
+
+def _as_text(content):
+    # Message content may be structured (dict or list); the optimizer needs text
+    return content if isinstance(content, str) else str(content)
+
+
+def put_many(store, namespace, items, index=False):
+    """
+    Write several items to one namespace with a single store round-trip.
+    
+    Prompts are only ever read back by key, so by default the items are not
+    embedded for semantic search.
+    
+    Args:
+        store: Memory store instance.
+        namespace: Namespace tuple to write to.
+        items: Dictionary mapping keys to the values to store.
+        index: Fields to embed, None for the store default, or False for none.
+    """
+    store.batch([PutOp(namespace, key, value, index) for key, value in items.items()])
+
+
+def _format_example(example):
+    # Format one example; the email dict is looked up once
+    email = example.value["email"]
+    return f"""Email Subject: {email['subject']}
+Email From: {email['author']}
+Email To: {email['to']}
+Email Content: 
+```
+{email['email_thread'][:400]}
+```
+> Triage Result: {example.value['label']}"""
 
 
 def format_few_shot_examples(examples):
@@ -24,28 +119,9 @@ def format_few_shot_examples(examples):
     Returns:
         str: Formatted examples as a string for inclusion in a prompt.
     """
-    # Template for formatting an example
-    template = """Email Subject: {subject}
-Email From: {from_email}
-Email To: {to_email}
-Email Content: 
-```
-{content}
-```
-> Triage Result: {result}"""
-
-    strs = ["Here are some previous examples:"]
-    for eg in examples:
-        strs.append(
-            template.format(
-                subject=eg.value["email"]["subject"],
-                to_email=eg.value["email"]["to"],
-                from_email=eg.value["email"]["author"],
-                content=eg.value["email"]["email_thread"][:400],
-                result=eg.value["label"],
-            )
-        )
-    return "\n\n------------\n\n".join(strs)
+    return "\n\n------------\n\n".join(
+        ["Here are some previous examples:", *map(_format_example, examples)]
+    )
 
 
 def get_triage_prompts(store, user_id):
@@ -59,45 +135,32 @@ def get_triage_prompts(store, user_id):
     Returns:
         tuple: (ignore_prompt, notify_prompt, respond_prompt) - Prompts for different triage categories.
     """
+    cache_key = (id(store), user_id, "triage")
+    cached = _PROMPT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     namespace = (user_id, )
-
-    # Get ignore prompt
-    result = store.get(namespace, "triage_ignore")
-    if result is None:
-        store.put(
-            namespace, 
-            "triage_ignore", 
-            {"prompt": PROMPT_INSTRUCTIONS["triage_rules"]["ignore"]}
-        )
-        ignore_prompt = PROMPT_INSTRUCTIONS["triage_rules"]["ignore"]
-    else:
-        ignore_prompt = result.value['prompt']
-
-    # Get notify prompt
-    result = store.get(namespace, "triage_notify")
-    if result is None:
-        store.put(
-            namespace, 
-            "triage_notify", 
-            {"prompt": PROMPT_INSTRUCTIONS["triage_rules"]["notify"]}
-        )
-        notify_prompt = PROMPT_INSTRUCTIONS["triage_rules"]["notify"]
-    else:
-        notify_prompt = result.value['prompt']
-
-    # Get respond prompt
-    result = store.get(namespace, "triage_respond")
-    if result is None:
-        store.put(
-            namespace, 
-            "triage_respond", 
-            {"prompt": PROMPT_INSTRUCTIONS["triage_rules"]["respond"]}
-        )
-        respond_prompt = PROMPT_INSTRUCTIONS["triage_rules"]["respond"]
-    else:
-        respond_prompt = result.value['prompt']
-        
-    return ignore_prompt, notify_prompt, respond_prompt
+    
+    # Get all three triage prompts in one store round-trip
+    results = store.batch([GetOp(namespace, key) for key in _TRIAGE_PROMPT_KEYS.values()])
+    
+    # Seed missing prompts with the defaults, again in one round-trip
+    prompts = []
+    defaults = {}
+    for (category, key), result in zip(_TRIAGE_PROMPT_KEYS.items(), results):
+        if result is None:
+            prompt = PROMPT_INSTRUCTIONS["triage_rules"][category]
+            defaults[key] = {"prompt": prompt}
+        else:
+            prompt = result.value['prompt']
+        prompts.append(prompt)
+    if defaults:
+        put_many(store, namespace, defaults)
+    
+    prompts = tuple(prompts)
+    _PROMPT_CACHE.put(cache_key, prompts)
+    return prompts
 
 
 def get_agent_instructions(store, user_id):
@@ -111,21 +174,84 @@ def get_agent_instructions(store, user_id):
     Returns:
         str: Agent instructions prompt.
     """
+    cache_key = (id(store), user_id, "agent")
+    cached = _PROMPT_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    
     namespace = (user_id, )
     result = store.get(namespace, "agent_instructions")
     if result is None:
         store.put(
             namespace, 
             "agent_instructions", 
-            {"prompt": PROMPT_INSTRUCTIONS["agent_instructions"]}
+            {"prompt": PROMPT_INSTRUCTIONS["agent_instructions"]},
+            index=False
         )
         prompt = PROMPT_INSTRUCTIONS["agent_instructions"]
     else:
         prompt = result.value['prompt']
     
+    _PROMPT_CACHE.put(cache_key, prompt)
     return prompt
 
 
+@lru_cache(maxsize=128)
+def build_triage_prompt(ignore_prompt, notify_prompt, respond_prompt):
+    """
+    Render the static blocks of the triage system prompt.
+    
+    Results are memoized, so repeated calls with unchanged rules skip formatting.
+    
+    Args:
+        ignore_prompt: Rules for emails to ignore.
+        notify_prompt: Rules for emails to notify about.
+        respond_prompt: Rules for emails to respond to.
+        
+    Returns:
+        tuple: The profile header block followed by one block per triage rule.
+    """
+    return (
+        _TRIAGE_PROMPT_HEADER,
+        triage_rules_ignore_prompt.format(triage_no=ignore_prompt),
+        triage_rules_notify_prompt.format(name=USER_PROFILE["name"], triage_notify=notify_prompt),
+        triage_rules_respond_prompt.format(triage_email=respond_prompt)
+    )
+
+
+@lru_cache(maxsize=128)
+def build_agent_prompt(instructions):
+    """
+    Render the response agent system prompt.
+    
+    Results are memoized, so repeated calls with unchanged instructions skip formatting.
+    
+    Args:
+        instructions: Agent instructions prompt.
+        
+    Returns:
+        str: The formatted system prompt.
+    """
+    return _AGENT_PROMPT_HEAD + instructions + _AGENT_PROMPT_TAIL
+
+
+def load_cached_prompts(store, user_id):
+    """
+    Render a user's prompts once so graph nodes can reuse them from the state.
+    
+    Args:
+        store: Memory store instance.
+        user_id: User ID for namespacing.
+        
+    Returns:
+        dict: State fields 'triage_prompt_cached' and 'agent_prompt_cached'.
+    """
+    return {
+        "triage_prompt_cached": build_triage_prompt(*get_triage_prompts(store, user_id)),
+        "agent_prompt_cached": build_agent_prompt(get_agent_instructions(store, user_id))
+    }
+
+
 def optimize_prompts(store, llm, user_id, messages, feedback):
     """
     Update prompts based on user feedback about email responses.
@@ -142,34 +268,25 @@ def optimize_prompts(store, llm, user_id, messages, feedback):
     """
     try:
         # Sanitize feedback to prevent jailbreak attempts
-        sanitized_feedback = feedback.replace("ignore all previous", "consider previous")
-        sanitized_feedback = sanitized_feedback.replace("ignore previous", "consider previous")
-        sanitized_feedback = sanitized_feedback.replace("disregard", "consider")
+        sanitized_feedback = _JAILBREAK_RE.sub(
+            lambda match: _JAILBREAK_REPLACEMENTS[match.group(0).lower()], feedback
+        )
         
         # Add a safety prefix
         safe_feedback = f"Email assistant behavior update request: {sanitized_feedback}"
         
-        # Process messages into optimizer-compatible format
+        # Process messages into optimizer-compatible format: keep dict messages
+        # only, default the role, stringify and truncate long content
         safe_messages = []
         if messages and isinstance(messages, list):
-            for msg in messages:
-                if isinstance(msg, dict):
-                    # Ensure we have both role and content
-                    role = msg.get("role", "assistant")
-                    
-                    # Handle content properly
-                    content = msg.get("content", "")
-                    
-                    # Convert complex content to string
-                    if isinstance(content, dict):
-                        content = str(content)
-                    
-                    # Truncate long messages
-                    if len(content) > 200:
-                        content = content[:200] + "..."
-                    
-                    # Add properly formatted message
-                    safe_messages.append({"role": role, "content": content})
+            safe_messages = [
+                {
+                    "role": msg.get("role", "assistant"),
+                    "content": content if len(content) <= 200 else content[:200] + "..."
+                }
+                for msg in messages if isinstance(msg, dict)
+                for content in (_as_text(msg.get("content", "")),)
+            ]
         
         # Create default messages if needed
         if not safe_messages:
@@ -223,27 +340,22 @@ def optimize_prompts(store, llm, user_id, messages, feedback):
             # Get updated prompts
             updated = optimizer.invoke({"trajectories": conversations, "prompts": prompts})
             
-            # Store updates and collect results
+            # Collect updated prompts and results
             update_summary = []
-            for i, updated_prompt in enumerate(updated):
-                old_prompt = prompts[i]
+            updates = {}
+            for old_prompt, updated_prompt in zip(prompts, updated):
                 if updated_prompt['prompt'] != old_prompt['prompt']:
                     name = old_prompt['name']
                     update_summary.append(f"✅ Updated: **{name}**")
-                    
-                    # Store the updated prompt
-                    if name == "main_agent":
-                        store.put(namespace, "agent_instructions", {"prompt": updated_prompt['prompt']})
-                    elif name == "triage-ignore":
-                        store.put(namespace, "triage_ignore", {"prompt": updated_prompt['prompt']})
-                    elif name == "triage-notify":
-                        store.put(namespace, "triage_notify", {"prompt": updated_prompt['prompt']})
-                    elif name == "triage-respond":
-                        store.put(namespace, "triage_respond", {"prompt": updated_prompt['prompt']})
+                    updates[_NAME_TO_KEY[name]] = {"prompt": updated_prompt['prompt']}
             
             if not update_summary:
                 return "No prompts were updated based on your feedback."
             
+            # Store all updated prompts in one batch
+            put_many(store, namespace, updates)
+            invalidate_prompt_cache(store, user_id)
+            
             return "## Prompt Updates\n\n" + "\n".join(update_summary)
             
         except Exception as e:
@@ -253,8 +365,10 @@ def optimize_prompts(store, llm, user_id, messages, feedback):
                 return f"⚠️ **Optimization Error**\n\nCould not update prompts: {str(e)}"
     
     except Exception as e:
-        # Log the full error for debugging
-        error_msg = f"Error in optimize_prompts: {str(e)}\n{traceback.format_exc()}"
+        # Log the error, with the full traceback only when debugging
+        error_msg = f"Error in optimize_prompts: {str(e)}"
+        if get_default_logger().logger.isEnabledFor(logging.DEBUG):
+            error_msg += f"\n{traceback.format_exc()}"
         error(error_msg)
         return f"❌ **Error Processing Feedback**\n\nAn error occurred while processing your feedback. Please try again with simpler instructions.\n\nTechnical details: {str(e)}"
 
@@ -291,9 +405,11 @@ def save_prompts(store, user_id, main_prompt, ignore_prompt, notify_prompt, resp
     Returns:
         str: Success message.
     """
-    namespace = (user_id,)
-    store.put(namespace, "agent_instructions", {"prompt": main_prompt})
-    store.put(namespace, "triage_ignore", {"prompt": ignore_prompt})
-    store.put(namespace, "triage_notify", {"prompt": notify_prompt})
-    store.put(namespace, "triage_respond", {"prompt": respond_prompt})
+    put_many(store, (user_id,), {
+        "agent_instructions": {"prompt": main_prompt},
+        "triage_ignore": {"prompt": ignore_prompt},
+        "triage_notify": {"prompt": notify_prompt},
+        "triage_respond": {"prompt": respond_prompt}
+    })
+    invalidate_prompt_cache(store, user_id)
     return "✅ Prompts saved successfully!"
\ No newline at end of file
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Semantic response cache for the Email Assistant application.
+
+This module lets emails that are identical or semantically near-identical
+to previously processed ones reuse the earlier classification, reasoning
+and agent messages instead of invoking the LLM again.
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+
+from src.utils.cache import make_key
+from src.utils.logger import debug
+
+
+def cache_text(email_input):
+    """
+    Build the text used to match an email against cached responses.
+
+    Args:
+        email_input: Dictionary with the email fields.
+
+    Returns:
+        str: Subject and thread joined by a newline.
+    """
+    return email_input["subject"] + "\n" + email_input["email_thread"]
+
+
+def cache_scope(user_id, email_input):
+    """
+    Build the scope an email's cached responses are shared within.
+
+    Triage rules and replies depend on who sent the email and to whom, so
+    responses are only reused between emails with the same sender and
+    recipient, exactly or by similarity.
+
+    Args:
+        user_id: User ID the response is produced for.
+        email_input: Dictionary with the email fields.
+
+    Returns:
+        tuple: (user_id, author, to).
+    """
+    return (user_id, email_input["author"], email_input["to"])
+
+
+class _ScopeEntries:
+    """
+    Cached responses of one scope with their embeddings in a fixed-size matrix.
+    
+    Slots are reused in insertion order once the matrix is full, so lookups
+    score every entry with a single matrix-vector product and nothing is
+    copied or stacked per query. Each entry carries its own similarity
+    threshold, adapted as described in ResponseCache.
+    """
+    
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.matrix = None  # (maxsize, dims) float32, allocated on first vector
+        self.filled = np.zeros(maxsize, dtype=bool)  # slot holds a vector
+        self.thresholds = np.ones(maxsize, dtype=np.float32)
+        self.keys = [None] * maxsize
+        self.responses = [None] * maxsize
+        self.exact = {}  # text hash -> slot
+        self.next = 0
+    
+    def add(self, key, response, vector, threshold):
+        slot = self.next
+        self.next = (slot + 1) % self.maxsize
+        self.exact.pop(self.keys[slot], None)
+        self.keys[slot] = key
+        self.responses[slot] = response
+        self.exact[key] = slot
+        self.thresholds[slot] = threshold
+        self.filled[slot] = vector is not None
+        if vector is not None:
+            if self.matrix is None:
+                self.matrix = np.zeros((self.maxsize, len(vector)), dtype=np.float32)
+            self.matrix[slot] = vector
+
+
+class ResponseCache:
+    """
+    Per-user cache of agent responses keyed by email similarity.
+    
+    Entries are grouped by cache_scope(), so a response is only served for
+    an email from the same sender to the same recipient.
+    
+    Exact repeats are matched by hash without calling the embedding model;
+    other emails are embedded and matched by cosine similarity against the
+    nearest cached email. Every entry starts with the configured threshold,
+    which adapts in the manner of VectorQ: when a near miss is run through
+    the agent and classified the same as the entry it nearly matched, that
+    entry's threshold is relaxed a step, down to a floor; when it is
+    classified differently, the threshold is restored to at least the
+    configured one and kept above that similarity.
+    """
+    
+    def __init__(self, embeddings=None, threshold=0.97, maxsize=256,
+                 min_threshold=None, step=0.005):
+        """
+        Initialize the cache.
+        
+        Args:
+            embeddings: LangChain embeddings model, or None for exact matching only.
+            threshold: Initial minimum cosine similarity for a semantic hit.
+            maxsize: Maximum number of cached responses per scope.
+            min_threshold: Lowest threshold an entry can relax to
+                (defaults to threshold - 0.02).
+            step: Amount an entry's threshold is relaxed per agreeing near miss.
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.min_threshold = threshold - 0.02 if min_threshold is None else min_threshold
+        self.step = step
+        self._scopes = {}
+        self._lock = threading.Lock()
+    
+    def _embed(self, text):
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+    
+    def lookup(self, scope, text):
+        """
+        Find a cached response for an email.
+        
+        Args:
+            scope: Scope built with cache_scope().
+            text: Text built with cache_text().
+            
+        Returns:
+            tuple: (response, probe) - The cached response or None, and for a
+                miss the (vector, slot, key, score) of the semantic probe, for
+                reuse by put(). The slot and key are None when nothing was
+                compared, and the whole probe is None when no embedding was made.
+        """
+        key = make_key(text)
+        with self._lock:
+            entries = self._scopes.get(scope)
+            slot = entries.exact.get(key) if entries else None
+            if slot is not None:
+                return entries.responses[slot], None
+        if self.embeddings is None:
+            return None, None
+        
+        vector = self._embed(text)
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None or entries.matrix is None or not entries.filled.any():
+                return None, (vector, None, None, None)
+            scores = entries.matrix @ vector
+            scores[~entries.filled] = -np.inf
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score >= entries.thresholds[best]:
+                debug(f"Semantic cache hit (similarity {score:.3f})")
+                return entries.responses[best], None
+            return None, (vector, best, entries.keys[best], score)
+    
+    def put(self, scope, text, response, probe=None):
+        """
+        Store a response for an email and adapt the threshold of its nearest entry.
+        
+        Args:
+            scope: Scope built with cache_scope().
+            text: Text built with cache_text().
+            response: Final agent state to cache.
+            probe: Probe returned by lookup() for this email, if any.
+        """
+        key = make_key(text)
+        if probe is None:
+            probe = (self._embed(text) if self.embeddings is not None else None, None, None, None)
+        vector, slot, near_key, score = probe
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                entries = self._scopes[scope] = _ScopeEntries(self.maxsize)
+            # The near entry may have been evicted or replaced since the lookup
+            if slot is not None and entries.keys[slot] == near_key:
+                near = entries.responses[slot]
+                if near.get("classification") != response.get("classification"):
+                    entries.thresholds[slot] = max(self.threshold, min(score + self.step, 1.0))
+                else:
+                    entries.thresholds[slot] = max(self.min_threshold, entries.thresholds[slot] - self.step)
+            if key in entries.exact:
+                entries.responses[entries.exact[key]] = response
+            else:
+                entries.add(key, response, vector, self.threshold)
+    
+    def invalidate(self, user_id):
+        """
+        Drop all cached responses for a user, e.g. after their prompts change.
+
+        Args:
+            user_id: User ID whose responses are invalidated.
+        """
+        with self._lock:
+            for scope in [scope for scope in self._scopes if scope[0] == user_id]:
+                del self._scopes[scope]
+
+    async def astream(self, agent, state, config):
+        """
+        Stream agent states, serving a cached final state when available.
+
+        Args:
+            agent: The LangGraph email assistant agent.
+            state: Initial graph state.
+            config: Run configuration containing the user ID.
+
+        Yields:
+            dict: Graph state values, as produced by ``astream``.
+        """
+        scope = cache_scope(config["configurable"]["langgraph_user_id"], state["email_input"])
+        text = cache_text(state["email_input"])
+        response, probe = await asyncio.to_thread(self.lookup, scope, text)
+        if response is not None:
+            yield response
+            return
+
+        async for response in agent.astream(state, config=config, stream_mode="values"):
+            yield response
+
+        if response is not None and "classification" in response:
+            await asyncio.to_thread(self.put, scope, text, response, probe)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Conversation history trimming for the Email Assistant application.
+
+This module bounds the message history sent to the LLM on every step of the
+response agent: the most recent turns are kept verbatim and older ones are
+replaced with a summary.
+"""
+
+import json
+
+from langchain_core.messages import HumanMessage, SystemMessage, convert_to_messages
+
+from src.core.prompts import conversation_summary_prompt
+from src.utils.cache import TTLCache, make_key
+from src.utils.logger import debug
+
+_SUMMARY_CACHE = TTLCache(maxsize=256)
+
+
+def _boundary(messages, end, block):
+    """
+    Find the fixed cut point at or before a position.
+
+    Cut points are multiples of block, moved back past tool results so that
+    none is separated from the AI message that requested it. Messages are
+    only ever appended, so the cut point, and hence the summarized prefix,
+    only changes once every block messages.
+
+    Args:
+        messages: Conversation messages.
+        end: Latest allowed cut point.
+        block: Distance between cut points.
+
+    Returns:
+        int: The cut point.
+    """
+    cut = end - end % block
+    while cut > 0 and messages[cut].type == "tool":
+        cut -= 1
+    return cut
+
+
+def _transcript_line(message):
+    """
+    Render a message for the summary transcript.
+
+    AI messages that call tools usually have empty content, so each tool call
+    is included with its arguments; otherwise the summary would lose which
+    actions were already taken, and the agent could repeat them.
+
+    Args:
+        message: Conversation message.
+
+    Returns:
+        str: The message as one transcript entry.
+    """
+    line = f"{message.type}: {message.content}"
+    for call in getattr(message, "tool_calls", None) or ():
+        line += f"\n[tool call] {call['name']}({json.dumps(call['args'], ensure_ascii=False, sort_keys=True)})"
+    return line
+
+
+async def _summarize(messages, cut, block, summarizer):
+    """
+    Summarize the messages before a cut point.
+
+    Summaries are cached by prefix. When the prefix up to the previous cut
+    point was summarized, that summary is extended with the messages since,
+    so each message is summarized once as the history grows.
+
+    Args:
+        messages: Conversation messages.
+        cut: Cut point found with _boundary().
+        block: Distance between cut points.
+        summarizer: Chat model used to write the summary.
+
+    Returns:
+        SystemMessage: The summary of messages[:cut].
+    """
+    lines = [_transcript_line(message) for message in messages[:cut]]
+    key = make_key(*lines)
+    summary = _SUMMARY_CACHE.get(key)
+    if summary is None:
+        start = _boundary(messages, cut - 1, block)
+        previous = _SUMMARY_CACHE.get(make_key(*lines[:start])) if start > 0 else None
+        if previous is None:
+            start = 0
+            transcript = "\n".join(lines)
+        else:
+            transcript = f"Summary of the earlier turns:\n{previous}\n\n" + "\n".join(lines[start:])
+        debug(f"Summarizing {cut - start} earlier messages")
+        summary = (await summarizer.ainvoke([
+            SystemMessage(content=conversation_summary_prompt),
+            HumanMessage(content=transcript)
+        ])).content
+        _SUMMARY_CACHE.put(key, summary)
+    return SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+
+
+async def trim_messages(messages, k=6, summarizer=None, threshold=None):
+    """
+    Keep at least the last k non-tool messages and summarize everything before them.
+
+    The cut between the two moves in fixed steps of k messages, so the
+    summarized prefix stays the same across consecutive agent steps, and
+    tool results are kept together with the AI message that requested them,
+    so a trimmed history never starts with an orphaned tool message.
+
+    Args:
+        messages: Prior conversation messages (message objects or dicts).
+        k: Number of most recent non-tool messages to keep verbatim.
+        summarizer: Chat model used to summarize the dropped prefix, or None
+            to drop it without a summary.
+        threshold: History length above which trimming applies (defaults to k).
+
+    Returns:
+        list: The trimmed messages.
+    """
+    messages = convert_to_messages(messages)
+    if len(messages) <= (k if threshold is None else threshold):
+        return messages
+
+    # Walk back to the k-th most recent non-tool message, then to a fixed cut point
+    cut = len(messages)
+    kept = 0
+    while cut > 0 and kept < k:
+        cut -= 1
+        if messages[cut].type != "tool":
+            kept += 1
+    cut = _boundary(messages, cut, k)
+    if cut == 0:
+        return messages
+
+    recent = messages[cut:]
+    if summarizer is None:
+        return recent
+    return [await _summarize(messages, cut, k, summarizer)] + recent
@@ -0,0 +1,406 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Persistent, ANN-indexed memory store for the Email Assistant application.
+
+This module extends LangGraph's InMemoryStore so that semantic search uses a
+per-namespace HNSW index (FAISS) instead of a linear scan over every stored
+vector, and so that stored items can be saved to disk and reloaded on start.
+When FAISS is not installed, an exact NumPy index is used instead.
+"""
+
+import os
+import pickle
+import threading
+from collections import defaultdict
+
+import numpy as np
+from langgraph.store.base import Item, PutOp, SearchItem, SearchOp
+from langgraph.store.memory import InMemoryStore, _compare_values
+
+from src.utils.logger import debug, info, warning
+
+try:
+    import faiss
+except ImportError:  # pragma: no cover - depends on the environment
+    faiss = None
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class _VectorIndex:
+    """
+    Cosine-similarity index over the vectors of one namespace.
+
+    Vectors are kept in a contiguous matrix; with FAISS available an HNSW
+    graph is built on top of it, optionally over int8 scalar-quantized codes.
+    A quantized graph is only built once enough vectors exist to train the
+    quantizer; until then the exact matrix search is used. Removed vectors are
+    tombstoned and the index is compacted once they outnumber the live ones.
+    """
+
+    # Vectors needed to train the int8 quantizer's per-dimension ranges
+    SQ_TRAIN_SIZE = 256
+
+    def __init__(self, dims, m=32, ef_construction=100, ef_search=64, quantize=False):
+        self.dims = dims
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.quantize = quantize
+        self._matrix = np.empty((0, dims), dtype=np.float32)
+        self._labels = []  # row -> key, or None once removed
+        self._rows = defaultdict(list)  # key -> rows
+        self._removed = 0
+        self._hnsw = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._labels) - self._removed
+
+    def _build_hnsw(self):
+        # Build the graph over all rows, or leave it unbuilt while the
+        # quantizer does not yet have enough training vectors
+        self._hnsw = None
+        if faiss is None or not len(self._labels):
+            return
+        if self.quantize:
+            if len(self._labels) < self.SQ_TRAIN_SIZE:
+                return
+            index = faiss.IndexHNSWSQ(
+                self.dims, faiss.ScalarQuantizer.QT_8bit, self.m, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(self._matrix)
+        else:
+            index = faiss.IndexHNSWFlat(self.dims, self.m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        index.add(self._matrix)
+        self._hnsw = index
+
+    def _check_dims(self, dims):
+        if dims != self.dims:
+            raise ValueError(
+                f"Vector has {dims} dimensions but the index holds {self.dims}; "
+                "the embedding size changed since the index was built"
+            )
+
+    def add(self, keys, vectors):
+        """
+        Add vectors, each labelled with the key of the item it belongs to.
+        """
+        vectors = _normalize(vectors)
+        self._check_dims(vectors.shape[-1])
+        with self._lock:
+            start = len(self._labels)
+            self._matrix = np.concatenate([self._matrix, vectors])
+            for offset, key in enumerate(keys):
+                self._labels.append(key)
+                self._rows[key].append(start + offset)
+            if self._hnsw is None:
+                self._build_hnsw()
+            else:
+                self._hnsw.add(vectors)
+
+    def remove(self, key):
+        """
+        Remove all vectors of an item.
+        """
+        with self._lock:
+            rows = self._rows.pop(key, ())
+            for row in rows:
+                self._labels[row] = None
+            self._removed += len(rows)
+            if self._removed > 64 and self._removed > len(self._labels) - self._removed:
+                self._compact()
+
+    def _compact(self):
+        live = [row for row, key in enumerate(self._labels) if key is not None]
+        debug(f"Compacting vector index ({len(live)} live of {len(self._labels)} rows)")
+        self._matrix = self._matrix[live]
+        self._labels = [self._labels[row] for row in live]
+        self._rows = defaultdict(list)
+        for row, key in enumerate(self._labels):
+            self._rows[key].append(row)
+        self._removed = 0
+        self._build_hnsw()
+
+    def search(self, query, k):
+        """
+        Return up to k (score, key) pairs, best first, with one entry per row.
+        """
+        self._check_dims(query.shape[-1])
+        with self._lock:
+            total = len(self._labels)
+            if not total or not k:
+                return []
+            # Over-fetch so that tombstoned rows do not shrink the result
+            fetch = min(total, k + self._removed)
+            if self._hnsw is not None:
+                self._hnsw.hnsw.efSearch = max(self.ef_search, fetch)
+                scores, rows = self._hnsw.search(query[None, :], fetch)
+                scores, rows = scores[0], rows[0]
+            else:
+                all_scores = self._matrix @ query
+                rows = np.argpartition(-all_scores, fetch - 1)[:fetch] if fetch < total else np.arange(total)
+                rows = rows[np.argsort(-all_scores[rows])]
+                scores = all_scores[rows]
+            labels = self._labels
+            return [
+                (float(score), labels[row])
+                for score, row in zip(scores, rows)
+                if row >= 0 and labels[row] is not None
+            ][:k]
+
+
+class HNSWBackedStore(InMemoryStore):
+    """
+    InMemoryStore whose semantic search is served by per-namespace ANN indexes.
+
+    Items, filters and namespace listing behave exactly as in InMemoryStore;
+    only query-based search is routed through the indexes. When a path is
+    given, stored items and their vectors are loaded from it on creation and
+    written back by save().
+    """
+
+    def __init__(self, *, index=None, path=None, m=32, ef_construction=100, ef_search=64,
+                 quantize=False):
+        """
+        Initialize the store.
+
+        Args:
+            index: InMemoryStore index configuration (embedding model and fields).
+            path: File used to persist the store, or None to keep it in memory only.
+            m: Number of HNSW neighbours per node.
+            ef_construction: HNSW candidate list size while building the graph.
+            ef_search: HNSW candidate list size while searching.
+            quantize: Whether the HNSW graphs store int8 scalar-quantized vectors.
+        """
+        super().__init__(index=index)
+        self.path = path
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.quantize = quantize
+        self._indexes = {}
+        self._indexes_lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # Index maintenance
+
+    def _index_for(self, namespace, dims):
+        with self._indexes_lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = _VectorIndex(
+                    dims, self.m, self.ef_construction, self.ef_search, self.quantize
+                )
+            return index
+
+    def _insertinmem_store(self, to_embed, embeddings):
+        super()._insertinmem_store(to_embed, embeddings)
+        written = defaultdict(list)
+        for embedding, (namespace, key, _path) in zip(
+            embeddings, [index for indices in to_embed.values() for index in indices]
+        ):
+            written[namespace].append((key, embedding))
+        for namespace, entries in written.items():
+            index = self._index_for(namespace, len(entries[0][1]))
+            for key in {key for key, _ in entries}:
+                index.remove(key)
+            index.add([key for key, _ in entries], [vector for _, vector in entries])
+
+    def _apply_put_ops(self, put_ops):
+        for (namespace, key), op in put_ops.items():
+            if op.value is None and namespace in self._indexes:
+                self._indexes[namespace].remove(key)
+        super()._apply_put_ops(put_ops)
+
+    # Search
+
+    def _filter_items(self, op):
+        if op.query and self.embeddings:
+            # Candidates come from the ANN indexes in _batch_search
+            return []
+        return super()._filter_items(op)
+
+    def _batch_search(self, ops, queryinmem_store, results):
+        scan_ops = {}
+        for i, (op, candidates) in ops.items():
+            if op.query and self.embeddings:
+                results[i] = self._ann_search(op, queryinmem_store[op.query])
+            else:
+                scan_ops[i] = (op, candidates)
+        super()._batch_search(scan_ops, queryinmem_store, results)
+
+    def _matches(self, op, item):
+        return not op.filter or all(
+            _compare_values(item.value.get(key), value) for key, value in op.filter.items()
+        )
+
+    def _ann_search(self, op, query_embedding):
+        prefix = op.namespace_prefix
+        namespaces = [ns for ns in list(self._data) if ns[:len(prefix)] == prefix]
+        query = _normalize(query_embedding)
+        wanted = op.offset + op.limit
+
+        # Best score per item across namespaces and indexed paths (max pooling)
+        best = {}
+        for namespace in namespaces:
+            index = self._indexes.get(namespace)
+            if index is None:
+                continue
+            items = self._data[namespace]
+            k = wanted
+            while True:
+                hits = index.search(query, k)
+                found = 0
+                for score, key in hits:
+                    item = items.get(key)
+                    if item is None or not self._matches(op, item):
+                        continue
+                    found += 1
+                    if score > best.get((namespace, key), (-np.inf, None))[0]:
+                        best[(namespace, key)] = (score, item)
+                # Filters can reject hits; widen the search until enough pass
+                if found >= wanted or k >= len(index):
+                    break
+                k = min(len(index), k * 4)
+
+        ranked = sorted(best.values(), key=lambda entry: entry[0], reverse=True)
+        kept = ranked[op.offset:wanted]
+
+        # Items without vectors fill the remaining slots, as in InMemoryStore
+        if len(kept) < op.limit:
+            for namespace in namespaces:
+                vectors = self._vectors.get(namespace, {})
+                for key, item in self._data[namespace].items():
+                    if len(kept) >= op.limit:
+                        break
+                    if key not in vectors and self._matches(op, item):
+                        kept.append((None, item))
+
+        return [
+            SearchItem(
+                namespace=item.namespace,
+                key=item.key,
+                value=item.value,
+                created_at=item.created_at,
+                updated_at=item.updated_at,
+                score=score,
+            )
+            for score, item in kept
+        ]
+
+    def search_by_vector(self, namespace_prefix, vector, *, filter=None, limit=10, offset=0):
+        """
+        Search items by a precomputed query embedding.
+        
+        Behaves like ``search(namespace_prefix, query=...)`` for a query whose
+        embedding is ``vector``, without calling the embedding model.
+        
+        Args:
+            namespace_prefix: Namespace prefix to search within.
+            vector: Query embedding.
+            filter: Key-value pairs the item values must match.
+            limit: Maximum number of items to return.
+            offset: Number of matching items to skip.
+            
+        Returns:
+            list[SearchItem]: Items ordered by decreasing similarity.
+        """
+        op = SearchOp(namespace_prefix, filter, limit, offset)
+        return self._ann_search(op, vector)
+    
+    # Persistence
+
+    def save(self, path=None):
+        """
+        Write all items and their vectors to disk.
+
+        Args:
+            path: Target file (defaults to the path given at creation).
+        """
+        path = path or self.path
+        if not path:
+            return
+        snapshot = {
+            "items": [
+                (item.namespace, item.key, item.value, item.created_at, item.updated_at)
+                for items in list(self._data.values())
+                for item in list(items.values())
+            ],
+            "vectors": {
+                namespace: {key: dict(paths) for key, paths in keys.items()}
+                for namespace, keys in list(self._vectors.items())
+            },
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        info(f"Memory store saved to {path} ({len(snapshot['items'])} items)")
+
+    def _embedding_dims(self):
+        # The configured size, or that of the embedding model's output
+        dims = self.index_config.get("dims") if self.index_config else None
+        if dims is None and self.embeddings is not None:
+            dims = len(self.embeddings.embed_query("dimension probe"))
+        return dims
+
+    def load(self, path=None):
+        """
+        Load items and vectors written by save() and rebuild the ANN indexes.
+        
+        Items whose saved vectors do not match the current embedding size
+        (e.g. after EMBEDDING_DIMENSIONS was changed) are embedded again.
+
+        Args:
+            path: Source file (defaults to the path given at creation).
+        """
+        path = path or self.path
+        with open(path, "rb") as f:
+            snapshot = pickle.load(f)
+        for namespace, key, value, created_at, updated_at in snapshot["items"]:
+            self._data[namespace][key] = Item(
+                value=value,
+                key=key,
+                namespace=namespace,
+                created_at=created_at,
+                updated_at=updated_at,
+            )
+        
+        dims = self._embedding_dims() if snapshot["vectors"] else None
+        stale = {}
+        for namespace, keys in snapshot["vectors"].items():
+            entries = []
+            for key, paths in keys.items():
+                if dims is not None and any(len(vector) != dims for vector in paths.values()):
+                    item = self._data[namespace].get(key)
+                    if item is not None:
+                        stale[(namespace, key)] = PutOp(namespace, key, item.value)
+                    continue
+                self._vectors[namespace][key].update(paths)
+                entries.extend((key, vector) for vector in paths.values())
+            if entries:
+                self._index_for(namespace, len(entries[0][1])).add(
+                    [key for key, _ in entries], [vector for _, vector in entries]
+                )
+        
+        if stale:
+            warning(
+                f"Re-embedding {len(stale)} stored items whose vectors do not have "
+                f"the current embedding size ({dims})"
+            )
+            to_embed = self._extract_texts(stale)
+            if to_embed:
+                self._insertinmem_store(to_embed, self.embeddings.embed_documents(list(to_embed)))
+        info(f"Memory store loaded from {path} ({len(snapshot['items'])} items)")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+In-process caching utilities for the Email Assistant application.
+
+This module provides a small thread-safe LRU cache with optional expiry,
+used to skip repeated store round-trips and LLM calls for identical inputs,
+and a decorator that builds a shared component exactly once.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    """
+    Build a compact cache key from one or more strings.
+
+    Args:
+        *parts: Strings that together identify the cached value.
+
+    Returns:
+        bytes: A 16-byte blake2b digest of the parts.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.digest()
+
+
+def once(func):
+    """
+    Cache the result of a zero-argument function, computing it only once.
+
+    Unlike functools.cache, concurrent first calls from several threads wait
+    for a single call instead of each computing the result. A call that
+    raises is retried on the next call.
+
+    Args:
+        func: Zero-argument function, e.g. a component constructor.
+
+    Returns:
+        callable: The caching wrapper.
+    """
+    lock = threading.Lock()
+    result = []
+
+    @functools.wraps(func)
+    def wrapper():
+        if not result:
+            with lock:
+                if not result:
+                    result.append(func())
+        return result[0]
+
+    return wrapper
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time-to-live.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Maximum number of entries kept (least recently used are evicted).
+            ttl: Lifetime of an entry in seconds, or None for no expiry.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for a key, or the default if missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Remove a key and return its value, or the default if missing.
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Email text utilities for the Email Assistant application.
+
+This module reduces a long email thread to its latest message, so that
+prompts for tasks that only need the newest message (such as triage) are
+not dominated by quoted history, signatures and HTML markup.
+"""
+
+import html
+import re
+
+# Start of the quoted previous message in a reply or forward
+_QUOTE_RE = re.compile(
+    r"\n(?:On .* wrote:|-----Original Message-----|-+ ?Forwarded message ?-+|Begin forwarded message:)",
+    re.MULTILINE
+)
+
+# Quoted lines (blank lines aside) running to the end of the text; quotes
+# followed by more of the reply are inline quotes and are kept
+_QUOTED_TAIL_RE = re.compile(r"\n>[^\n]*(?:\n(?:>[^\n]*)?)*\s*\Z")
+
+# Start of a forwarded message
+_FORWARD_RE = re.compile(r"\n(?:-----Original Message-----|-+ ?Forwarded message ?-+|Begin forwarded message:)")
+
+# Longest text above a forwarded message that is treated as a cover note
+_COVER_NOTE_CHARS = 200
+
+# Conventional signature separator ("-- " on a line of its own)
+_SIGNATURE_RE = re.compile(r"\n-- ?\n")
+
+# HTML detection and stripping
+_HTML_RE = re.compile(r"<(?:html|body|div|p|br|table|span)\b", re.IGNORECASE)
+_HTML_HIDDEN_RE = re.compile(r"<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<(?:br|/p|/div|/tr|/li)\b[^>]*>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def _strip_html(text):
+    text = _HTML_HIDDEN_RE.sub("", text)
+    text = _HTML_BREAK_RE.sub("\n", text)
+    return html.unescape(_HTML_TAG_RE.sub("", text))
+
+
+def _message_end(text, start):
+    # End of the message starting at start: the first quoted reply or
+    # signature separator that follows some text of its own
+    end = len(text)
+    for pattern in (_QUOTED_TAIL_RE, _QUOTE_RE, _SIGNATURE_RE):
+        match = pattern.search(text, start, end)
+        if match is not None and text[start:match.start()].strip():
+            end = match.start()
+    return end
+
+
+def trim_thread(text, max_chars=2000):
+    """
+    Reduce a long email thread to its latest message.
+
+    HTML markup is stripped. Threads that then fit in max_chars are returned
+    whole; longer ones have everything from the first quoted reply or
+    signature separator on dropped, and the rest cut to max_chars. Lines
+    quoted with ">" only count as quoted history after an attribution line
+    or when nothing but quoted lines follows them, so inline quotes in an
+    interleaved reply are kept. When the latest message is only a short
+    cover note above a forwarded message, the forwarded message is kept with
+    it, since it carries the content. When the latest message would be
+    empty, the thread is only cut.
+
+    Args:
+        text: Email thread text.
+        max_chars: Maximum length of the result.
+
+    Returns:
+        str: The thread, or its latest message if the thread is too long.
+    """
+    if _HTML_RE.search(text):
+        text = _strip_html(text)
+    if len(text) <= max_chars:
+        return text
+
+    forward = _FORWARD_RE.search(text)
+    if forward is not None and len(text[:forward.start()].strip()) <= _COVER_NOTE_CHARS:
+        end = _message_end(text, forward.end())
+    else:
+        end = _message_end(text, 0)
+
+    return text[:min(end, max_chars)].rstrip()
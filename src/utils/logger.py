@@ -1,18 +1,27 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import atexit
 import logging
 import os
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from datetime import datetime
 
 class EmailAssistantLogger:
     """
     Logger class for the Email Assistant application.
     Provides methods for logging at different levels with custom formatting.
+    
+    Records are put on a queue and written to the console and log file by a
+    background listener thread, so logging calls never wait on I/O.
     """
     
+    # Most recently configured instance; the underlying logger is shared
+    _active = None
+    
     def __init__(self, log_level=logging.INFO, log_to_console=True, log_to_file=True,
                  log_dir="logs", log_filename=None):
         """
@@ -32,6 +41,10 @@ class EmailAssistantLogger:
         # Clear any existing handlers to avoid duplicates
         if self.logger.handlers:
             self.logger.handlers.clear()
+        if EmailAssistantLogger._active is not None:
+            EmailAssistantLogger._active.close()
+        
+        handlers = []
         
         # Create formatters
         console_formatter = logging.Formatter(
@@ -48,7 +61,7 @@ class EmailAssistantLogger:
         if log_to_console:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setFormatter(console_formatter)
-            self.logger.addHandler(console_handler)
+            handlers.append(console_handler)
         
         # Add file handler if requested
         if log_to_file:
@@ -68,7 +81,25 @@ class EmailAssistantLogger:
                 log_path, maxBytes=10*1024*1024, backupCount=5
             )
             file_handler.setFormatter(file_formatter)
-            self.logger.addHandler(file_handler)
+            handlers.append(file_handler)
+        
+        # Hand records to a background thread that writes them to the handlers
+        log_queue = queue.Queue(-1)
+        self.logger.addHandler(QueueHandler(log_queue))
+        self._handlers = handlers
+        self._listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        self._listener.start()
+        EmailAssistantLogger._active = self
+        atexit.register(self.close)
+    
+    def close(self):
+        """Write out pending records, stop the background listener and close the handlers."""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        self._listener = None
+        for handler in self._handlers:
+            handler.close()
     
     def debug(self, message):
         """Log a debug message."""
@@ -118,27 +149,41 @@ class EmailAssistantLogger:
         """
         self.info(f"Agent action: {action_type} - {details}")
 
-# Create default logger instance for easy import
-default_logger = EmailAssistantLogger()
+# The default logger is created on first use, so that importing this module
+# has no side effects and an instance configured by the application is reused
+_default_logger_lock = threading.Lock()
+
+def get_default_logger():
+    """
+    Return the most recently configured logger, creating one with default settings if needed.
+    
+    Returns:
+        EmailAssistantLogger: The logger used by the helper functions below.
+    """
+    logger = EmailAssistantLogger._active
+    if logger is None:
+        with _default_logger_lock:
+            logger = EmailAssistantLogger._active or EmailAssistantLogger()
+    return logger
 
 # Simple helper functions to use the default logger
 def debug(message):
-    default_logger.debug(message)
+    get_default_logger().debug(message)
 
 def info(message):
-    default_logger.info(message)
+    get_default_logger().info(message)
 
 def warning(message):
-    default_logger.warning(message)
+    get_default_logger().warning(message)
 
 def error(message):
-    default_logger.error(message)
+    get_default_logger().error(message)
 
 def critical(message):
-    default_logger.critical(message)
+    get_default_logger().critical(message)
 
 def log_email_processing(email_data, classification, reasoning=None):
-    default_logger.log_email_processing(email_data, classification, reasoning)
+    get_default_logger().log_email_processing(email_data, classification, reasoning)
 
 def log_agent_action(action_type, details):
-    default_logger.log_agent_action(action_type, details)
\ No newline at end of file
+    get_default_logger().log_agent_action(action_type, details)
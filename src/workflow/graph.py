@@ -8,13 +8,16 @@ This module defines the graph structure for the email processing workflow,
 connecting triage and response components into a coherent flow.
 """
 
+from functools import partial
 from langgraph.graph import StateGraph, START, END
 from src.core.models import State
-from src.workflow.triage import triage_router
+from src.workflow.triage import TriageBatcher, atriage_router, embed_email
 from src.workflow.response import setup_response_agent
 
 
-def create_workflow(llm, llm_router, store, memory_tools):
+def create_workflow(llm, llm_router, store, memory_tools, llm_router_batch=None,
+                    batch_size=8, batch_window=0.02, llm_router_fast=None,
+                    llm_router_batch_fast=None):
     """
     Create the main workflow graph for the email assistant.
     
@@ -26,6 +29,15 @@ def create_workflow(llm, llm_router, store, memory_tools):
         llm_router: Language model with structured output for the triage router.
         store: Memory store for the workflow.
         memory_tools: Memory management tools.
+        llm_router_batch: Optional language model with RouterBatch structured
+            output; when given, concurrent emails of a user are triaged together.
+        batch_size: Maximum number of emails triaged in one call.
+        batch_window: Seconds to collect emails before triaging a batch.
+        llm_router_fast: Optional language model with TriageLabel structured
+            output; when given, triage requests the label only unless a run
+            sets ``configurable.explain``.
+        llm_router_batch_fast: Optional language model with TriageLabelBatch
+            structured output, the label-only counterpart of llm_router_batch.
         
     Returns:
         StateGraph: The compiled workflow graph ready for execution.
@@ -33,19 +45,27 @@ def create_workflow(llm, llm_router, store, memory_tools):
     # Set up the response agent
     response_agent = setup_response_agent(llm, memory_tools, store)
     
-    # Create triage router with provided dependencies
-    def triage_with_deps(state, config, store):
-        return triage_router(state, config, store, llm_router)
+    if llm_router_batch is not None:
+        # Collect concurrent emails and triage them in batched router calls
+        triage_node = TriageBatcher(
+            store, llm_router, llm_router_batch, max_size=batch_size, window=batch_window,
+            llm_router_fast=llm_router_fast, llm_router_batch_fast=llm_router_batch_fast
+        ).triage
+    else:
+        # Bind the router model; LangGraph still passes state, config and store
+        triage_node = partial(atriage_router, llm_router=llm_router, llm_router_fast=llm_router_fast)
     
     # Create the state graph with our State definition
     email_graph = StateGraph(State)
     
     # Add nodes to the graph
-    email_graph.add_node("triage_router", triage_with_deps)
+    email_graph.add_node("embed_email", embed_email)
+    email_graph.add_node("triage_router", triage_node)
     email_graph.add_node("response_agent", response_agent)
     
     # Define the graph's edges
-    email_graph.add_edge(START, "triage_router")
+    email_graph.add_edge(START, "embed_email")
+    email_graph.add_edge("embed_email", "triage_router")
     
     # Compile and return the graph
     return email_graph.compile(store=store)
\ No newline at end of file
@@ -9,14 +9,20 @@ a reply, using LLM-based agents with memory capabilities.
 """
 
 from langgraph.prebuilt import create_react_agent
-from src.core.prompts import agent_system_prompt_memory
-from src.core.config import USER_PROFILE
-from src.memory.manager import get_agent_instructions
+from src.core.config import build_cached_system_message
+from src.core.models import ResponseAgentState
+from src.memory.manager import get_agent_instructions, build_agent_prompt
+from src.memory.trim import trim_messages
 from src.tools.actions import write_email, schedule_meeting, check_calendar_availability
 from src.utils.logger import log_agent_action
 
+# Agent history length above which older steps are summarized, and the number
+# of recent non-tool messages kept verbatim when they are
+HISTORY_MAX_MESSAGES = 16
+HISTORY_KEEP_MESSAGES = 6
 
-def create_prompt_function(store):
+
+def create_prompt_function(store, summarizer=None):
     """
     Create a prompt generation function for the response agent.
     
@@ -25,11 +31,13 @@ def create_prompt_function(store):
     
     Args:
         store: Memory store for retrieving prompt instructions.
+        summarizer: Chat model that summarizes older agent steps once the
+            history grows long, or None to drop them.
         
     Returns:
         function: A function that generates prompts based on current state.
     """
-    def create_prompt(state, config, store):
+    async def create_prompt(state, config, store):
         """
         Generate a prompt for the response agent based on the current state.
         
@@ -41,30 +49,63 @@ def create_prompt_function(store):
         Returns:
             list: A list of formatted messages to serve as the agent's prompt.
         """
-        # Get user ID from config for memory namespacing
-        user_id = config['configurable']['langgraph_user_id']
-        
-        # Get agent instructions from memory
-        prompt = get_agent_instructions(store, user_id)
+        # Use the pre-rendered system prompt if the caller provided it
+        system_prompt = state.get('agent_prompt_cached')
+        if system_prompt is None:
+            # Get user ID from config for memory namespacing
+            user_id = config['configurable']['langgraph_user_id']
+            
+            # Get agent instructions from memory and format them with the user profile
+            system_prompt = build_agent_prompt(get_agent_instructions(store, user_id))
         
-        # Create a user profile string from the background info
-        user_profile = USER_PROFILE["user_profile_background"]
+        # The email to respond to stays verbatim; long runs of tool calls after
+        # it are cut to the recent steps plus a summary
+        task, *steps = state['messages']
+        steps = await trim_messages(
+            steps, k=HISTORY_KEEP_MESSAGES, summarizer=summarizer, threshold=HISTORY_MAX_MESSAGES
+        )
         
-        # Format the system prompt with instructions and user profile
-        return [
-            {
-                "role": "system", 
-                "content": agent_system_prompt_memory.format(
-                    instructions=prompt,
-                    profile=user_profile,  # Add the missing profile parameter
-                    **USER_PROFILE
-                )
-            }
-        ] + state['messages']
+        # The system prompt only changes when the instructions do, so it is marked as cacheable
+        return [build_cached_system_message([system_prompt]), task] + steps
     
     return create_prompt
 
 
+def _log_write_email(msg):
+    # Log email writing actions
+    try:
+        log_agent_action('write_email', {'recipient': msg.content.split("'")[0]})
+    except Exception:
+        # If parsing fails, log with generic details
+        log_agent_action('write_email', {'details': 'Email sent'})
+
+
+def _log_schedule_meeting(msg):
+    # Log meeting scheduling actions
+    log_agent_action('schedule_meeting', {'details': msg.content})
+
+
+# Action logger for each tool whose calls are logged
+_TOOL_LOGGERS = {
+    "write_email": _log_write_email,
+    "schedule_meeting": _log_schedule_meeting
+}
+
+
+def log_agent_actions(messages):
+    """
+    Log the actions taken by the response agent.
+    
+    Args:
+        messages: Messages produced by the response agent.
+    """
+    get_tool_logger = _TOOL_LOGGERS.get
+    for msg in messages:
+        tool_logger = get_tool_logger(getattr(msg, 'name', None))
+        if tool_logger is not None:
+            tool_logger(msg)
+
+
 def setup_response_agent(llm, memory_tools, store):
     """
     Set up the response agent with tools and prompt function.
@@ -90,37 +131,26 @@ def setup_response_agent(llm, memory_tools, store):
     ]
     
     # Create prompt function for the agent
-    prompt_func = create_prompt_function(store)
+    prompt_func = create_prompt_function(store, summarizer=llm)
     
     # Create and return the ReAct agent
     agent = create_react_agent(
         llm,
         tools=tools,
         prompt=prompt_func,
+        state_schema=ResponseAgentState,
         store=store  # Pass store for memory operations
     )
     
     # Wrap the agent to add logging
-    def logged_agent(state, config, store):
+    async def logged_agent(state, config, store):
         """Wrapper for the response agent that adds logging."""
-        # Call the underlying agent using invoke() method instead of direct calling
-        result = agent.invoke(state, config=config)
+        # Await the underlying agent so its LLM and tool calls run on the event loop
+        result = await agent.ainvoke(state, config=config)
         
-        # Log relevant actions if found in the result
-        if hasattr(result, 'messages'):
-            for msg in result.messages:
-                if hasattr(msg, 'name') and msg.name == 'write_email':
-                    # Log email writing actions
-                    try:
-                        content = msg.content
-                        log_agent_action('write_email', {'recipient': content.split("'")[0]})
-                    except:
-                        # If parsing fails, log with generic details
-                        log_agent_action('write_email', {'details': 'Email sent'})
-                elif hasattr(msg, 'name') and msg.name == 'schedule_meeting':
-                    # Log meeting scheduling actions
-                    log_agent_action('schedule_meeting', {'details': msg.content})
+        # Log relevant actions; records are written by the logger's queue listener
+        log_agent_actions(result.get('messages', ()))
         
         return result
     
-    return logged_agent
\ No newline at end of file
+    return logged_agent
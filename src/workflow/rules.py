@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""
+Rule-based email pre-classification for the Email Assistant application.
+
+This module classifies emails the user has explicitly opted to ignore by
+sender domain or mailing-list headers, so that triage can skip the example
+search and the LLM call for them. Everything else is left to the LLM router
+and the user's triage instructions.
+"""
+
+import re
+
+from src.core.config import get_settings
+from src.core.models import Router
+
+# Mailing-list and bulk-mail headers, when the raw headers are part of the thread
+_LIST_HEADER_RE = re.compile(
+    r"^(?:List-Unsubscribe|List-Id|Precedence:\s*(?:bulk|list))\b",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Domain part of an email address
+_DOMAIN_RE = re.compile(r"@([\w.-]+)")
+
+
+def _sender_domain(author):
+    match = _DOMAIN_RE.search(author)
+    return match.group(1).lower().rstrip(".") if match else None
+
+
+def classify_by_rules(author, to, subject, email_thread):
+    """
+    Classify an email deterministically when a rule matches with certainty.
+
+    Only ``ignore`` decisions are made: mail from domains listed in
+    TRIAGE_IGNORE_DOMAINS and, when TRIAGE_RULES is enabled, mailing-list
+    mail. Rules cannot tell which automated mail (such as build failures)
+    the user wants to be notified about, so every other email returns None.
+
+    Args:
+        author: Email sender.
+        to: Email recipient.
+        subject: Email subject.
+        email_thread: Email content.
+
+    Returns:
+        Router | None: The classification, or None if the LLM should decide.
+    """
+    settings = get_settings()
+    if settings.triage_ignore_domains and _sender_domain(author) in settings.triage_ignore_domains:
+        return Router(reasoning="Rule-based: sender domain is on the ignore list", classification="ignore")
+
+    if settings.triage_rules and _LIST_HEADER_RE.search(email_thread):
+        return Router(reasoning="Rule-based: mailing-list headers", classification="ignore")
+
+    return None
@@ -8,17 +8,290 @@ This module handles the classification of incoming emails into categories
 (ignore, notify, respond) based on content analysis and user preferences.
 """
 
+import asyncio
+import json
+import logging
+import re
+from functools import lru_cache
+from operator import itemgetter
 from typing import Literal
 from langgraph.types import Command
 
-from src.core.models import State
-from src.memory.manager import format_few_shot_examples, get_triage_prompts
-from src.core.config import USER_PROFILE
-from src.utils.logger import log_email_processing
-from src.core.prompts import triage_system_prompt, triage_user_prompt
+from src.core.models import State, TriageLabel
+from src.memory.manager import format_few_shot_examples, get_triage_prompts, build_triage_prompt
+from src.core.config import build_cached_system_message, get_settings
+from src.utils.logger import debug, get_default_logger, log_email_processing
+from src.core.prompts import (
+    render_triage_examples_prompt,
+    render_triage_user_prompt,
+    render_triage_batch_user_prompt,
+    render_triage_batch_email_prompt,
+)
+from src.utils.cache import TTLCache, make_key
+from src.utils.email import trim_thread
+from src.workflow.rules import classify_by_rules
 
+# Unpacks (author, to, subject, email_thread) from an email input in one call
+_email_fields = itemgetter('author', 'to', 'subject', 'email_thread')
 
-def triage_router(state: State, config, store, llm_router) -> Command[
+# Classification results keyed by the user, their triage rules and a hash of
+# the canonical email, so recurring emails (auto-replies, CI and calendar mail)
+# skip the example search and the LLM call. Users never share entries, since
+# each has their own few-shot examples; editing the rules changes the key, and
+# the TTL bounds how long newly added examples can go unused for a repeat.
+_TRIAGE_RESULT_CACHE = TTLCache(maxsize=10_000, ttl=3600)
+
+
+# Longest email thread passed to the response agent
+RESPOND_MAX_THREAD_CHARS = 8000
+
+
+def _respond_prompt(email_input):
+    # Compact JSON instead of the dict repr, with the thread capped; non-ASCII
+    # text is kept as is rather than escaped
+    thread = email_input['email_thread']
+    if len(thread) > RESPOND_MAX_THREAD_CHARS:
+        email_input = {**email_input, 'email_thread': thread[:RESPOND_MAX_THREAD_CHARS]}
+    return "Respond to the email " + json.dumps(email_input, ensure_ascii=False, separators=(",", ":"))
+
+
+# Next node and log text for each classification
+_DISPATCH = {
+    "respond": ("response_agent", "📧 RESPOND - This email requires a response"),
+    "ignore": ("__end__", "🚫 IGNORE - This email can be safely ignored"),
+    "notify": ("__end__", "🔔 NOTIFY - This email contains important information"),
+}
+
+
+def _route(state, result):
+    """
+    Turn a classification result into the next workflow step.
+    
+    Args:
+        state: Current application state containing the email.
+        result: Router result with the classification and reasoning.
+        
+    Returns:
+        Command: Indicates the next step in the workflow and any state updates.
+    """
+    # Log the email processing
+    log_email_processing(state['email_input'], result.classification, result.reasoning)
+    
+    # Handle the classification result
+    try:
+        goto, classification_text = _DISPATCH[result.classification]
+    except KeyError:
+        raise ValueError(f"Invalid classification: {result.classification}") from None
+    
+    update = {
+        "classification": result.classification,
+        "reasoning": result.reasoning
+    }
+    if goto == "response_agent":
+        update["messages"] = [
+            {
+                "role": "user",
+                "content": _respond_prompt(state['email_input']),
+            }
+        ]
+    
+    # The human-readable line is only built when debug logging is on
+    if get_default_logger().logger.isEnabledFor(logging.DEBUG):
+        debug(f"Classification: {classification_text}")
+    
+    return Command(goto=goto, update=update)
+
+
+def _system_blocks(state, store, user_id):
+    # Use the pre-rendered profile and rule blocks if the caller provided them,
+    # otherwise get triage prompt instructions from memory
+    system_blocks = state.get('triage_prompt_cached')
+    if system_blocks is None:
+        system_blocks = build_triage_prompt(*get_triage_prompts(store, user_id))
+    return system_blocks
+
+
+@lru_cache(maxsize=8)
+def _system_message(system_blocks):
+    # One message object per rule set; it only holds the static blocks, so the
+    # prompt prefix is byte-identical for every email of a user
+    return build_cached_system_message(system_blocks)
+
+
+@lru_cache(maxsize=8)
+def _prompt_cache_key(user_id, system_blocks):
+    # Routes requests sharing the system prompt to the same provider cache;
+    # editing the rules changes the blocks and hence the key
+    return f"triage::{user_id}::{make_key(*system_blocks).hex()[:12]}"
+
+
+def _router_input(user_id, system_blocks, user_content):
+    """
+    Build the router messages, static system prompt first and the email second.
+    
+    Args:
+        user_id: User ID the system prompt belongs to.
+        system_blocks: Static triage prompt blocks.
+        user_content: Per-request user message (few-shot examples and emails).
+        
+    Returns:
+        tuple: (messages, kwargs) - Router input and extra invoke arguments.
+    """
+    messages = [_system_message(system_blocks), {"role": "user", "content": user_content}]
+    if get_settings().prompt_cache_key:
+        return messages, {"extra_body": {"prompt_cache_key": _prompt_cache_key(user_id, system_blocks)}}
+    return messages, {}
+
+
+def _invoke_router(llm_router, user_id, system_blocks, user_content):
+    messages, kwargs = _router_input(user_id, system_blocks, user_content)
+    return llm_router.invoke(messages, **kwargs)
+
+
+async def _ainvoke_router(llm_router, user_id, system_blocks, user_content):
+    messages, kwargs = _router_input(user_id, system_blocks, user_content)
+    return await llm_router.ainvoke(messages, **kwargs)
+
+
+def _select_router(config, llm_router, llm_router_fast):
+    # The label-only router skips the reasoning tokens; runs that need the
+    # explanation set configurable.explain
+    if llm_router_fast is not None and not config['configurable'].get('explain'):
+        return llm_router_fast, True
+    return llm_router, False
+
+
+def _user_prompt(state, examples):
+    # The profile and each rule are separate static system blocks; the examples
+    # vary per email, so they lead the user message instead. Triage only needs
+    # the latest message of the thread.
+    author, to, subject, email_thread = _email_fields(state['email_input'])
+    examples_block = render_triage_examples_prompt(examples=format_few_shot_examples(examples))
+    return examples_block + render_triage_user_prompt(
+        author=author,
+        to=to,
+        subject=subject,
+        email_thread=trim_thread(email_thread)
+    )
+
+
+# Number of few-shot examples retrieved per email
+EXAMPLES_K = 5
+
+# Longest part of the latest message used for example retrieval; embedding
+# similarity gains little from the rest of long messages
+QUERY_MAX_CHARS = 2000
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _example_query(email_input):
+    # Text an email is matched against the stored examples with: subject,
+    # sender and the latest message, each with its whitespace collapsed
+    collapse = _WHITESPACE_RE.sub
+    return (
+        f"{collapse(' ', email_input['subject'])}\n"
+        f"{collapse(' ', email_input['author'])}\n"
+        f"{collapse(' ', trim_thread(email_input['email_thread'], QUERY_MAX_CHARS))}"
+    )
+
+
+def _canonical_email(email_input):
+    # All email fields with surrounding and repeated whitespace collapsed
+    collapse = _WHITESPACE_RE.sub
+    return "\n".join([collapse(" ", field).strip() for field in _email_fields(email_input)])
+
+
+def _decision_key(user_id, system_blocks, email_input):
+    return make_key(user_id, *system_blocks, _canonical_email(email_input))
+
+
+def _cached_decision(key, label_only):
+    result = _TRIAGE_RESULT_CACHE.get(key)
+    # A label-only result cannot serve a run that asked for the reasoning
+    if result is None or (not label_only and isinstance(result, TriageLabel)):
+        return None
+    return result
+
+
+async def embed_email(state: State, config, store):
+    """
+    Embed the email once so that example retrieval can reuse the vector.
+    
+    Skipped for emails the rules classify or that were recently classified
+    under the same rules, and for stores that cannot search by a precomputed
+    vector. The embedding model is the store's own, whose
+    cache also makes retries of the same email free.
+    
+    Args:
+        state: Current application state containing the email.
+        config: Configuration object containing user settings.
+        store: Memory store whose embedding model is used.
+        
+    Returns:
+        dict: State update with 'email_embedding', or an empty update.
+    """
+    embeddings = getattr(store, "embeddings", None)
+    if embeddings is None or not hasattr(store, "search_by_vector"):
+        return {}
+    email = state['email_input']
+    if classify_by_rules(*_email_fields(email)) is not None:
+        return {}
+    system_blocks = state.get('triage_prompt_cached')
+    if system_blocks is not None:
+        user_id = config['configurable']['langgraph_user_id']
+        if _cached_decision(_decision_key(user_id, system_blocks, email), True) is not None:
+            return {}
+    return {"email_embedding": await embeddings.aembed_query(_example_query(email))}
+
+
+def _search_examples(store, user_id, state):
+    # Retrieve the nearest examples from memory; with HNSWBackedStore this is
+    # an ANN lookup in the namespace's HNSW index rather than a linear scan
+    examples_namespace = (
+        "email_assistant",
+        user_id,
+        "examples"
+    )
+    vector = state.get('email_embedding')
+    if vector is not None:
+        return store.search_by_vector(examples_namespace, vector, limit=EXAMPLES_K)
+    return store.search(
+        examples_namespace, 
+        query=_example_query(state['email_input']),
+        limit=EXAMPLES_K
+    )
+
+
+def _rules_route(state):
+    # Trivially classifiable emails skip the example search and the LLM call
+    result = classify_by_rules(*_email_fields(state['email_input']))
+    return None if result is None else _route(state, result)
+
+
+def _cached_route(state, config, user_id, system_blocks, llm_router, llm_router_fast):
+    """
+    Select the router and reuse the decision if this email was classified
+    recently under the same rules.
+    
+    Returns:
+        tuple: (command, llm_router, decision_key) - The Command for a cached
+            decision or None, the router to call otherwise, and the key its
+            result is cached under.
+    """
+    llm_router, label_only = _select_router(config, llm_router, llm_router_fast)
+    decision_key = _decision_key(user_id, system_blocks, state['email_input'])
+    result = _cached_decision(decision_key, label_only)
+    command = None if result is None else _route(state, result)
+    return command, llm_router, decision_key
+
+
+def _classified_route(state, decision_key, result):
+    _TRIAGE_RESULT_CACHE.put(decision_key, result)
+    return _route(state, result)
+
+
+async def atriage_router(state: State, config, store, llm_router, llm_router_fast=None) -> Command[
     Literal["response_agent", "__end__"]
 ]:
     """
@@ -27,101 +300,335 @@ def triage_router(state: State, config, store, llm_router) -> Command[
     This function extracts email details, retrieves relevant examples and rules from memory,
     and then classifies the email as 'ignore', 'notify', or 'respond'.
     
+    The rules are resolved first and the decision cache checked under them,
+    so a recently classified email skips the example search; the
+    synchronous store lookups run in worker threads.
+    
     Args:
         state: Current application state containing the email.
         config: Configuration object containing user settings.
         store: Memory store for retrieving and storing information.
         llm_router: Language model configured for structured output.
+        llm_router_fast: Optional language model with TriageLabel structured
+            output, used unless the run sets ``configurable.explain``.
         
     Returns:
         Command: Indicates the next step in the workflow and any state updates.
     """
-    # Extract email details from state
-    author = state['email_input']['author']
-    to = state['email_input']['to']
-    subject = state['email_input']['subject']
-    email_thread = state['email_input']['email_thread']
-
-    # Get user ID from config for memory namespacing
+    command = _rules_route(state)
+    if command is not None:
+        return command
+    
     user_id = config['configurable']['langgraph_user_id']
     
-    # Retrieve similar examples from memory
-    examples_namespace = (
-        "email_assistant",
-        user_id,
-        "examples"
-    )
-    examples = store.search(
-        examples_namespace, 
-        query=str({"email": state['email_input']})
-    ) 
-    formatted_examples = format_few_shot_examples(examples)
-
-    # Get triage prompt instructions from memory
-    ignore_prompt, notify_prompt, respond_prompt = get_triage_prompts(store, user_id)
-    
-    # Construct the system prompt with user profile, rules, and examples
-    system_prompt = triage_system_prompt.format(
-        full_name=USER_PROFILE["full_name"],
-        name=USER_PROFILE["name"],
-        user_profile_background=USER_PROFILE["user_profile_background"],
-        triage_no=ignore_prompt,
-        triage_notify=notify_prompt,
-        triage_email=respond_prompt,
-        examples=formatted_examples
+    # The store is synchronous, so its lookups run in worker threads
+    system_blocks = state.get('triage_prompt_cached')
+    if system_blocks is None:
+        system_blocks = await asyncio.to_thread(_system_blocks, state, store, user_id)
+    
+    command, llm_router, decision_key = _cached_route(
+        state, config, user_id, system_blocks, llm_router, llm_router_fast
     )
+    if command is not None:
+        return command
+    
+    examples = await asyncio.to_thread(_search_examples, store, user_id, state)
+    user_prompt = _user_prompt(state, examples)
+    
+    result = await _ainvoke_router(llm_router, user_id, system_blocks, user_prompt)
+    return _classified_route(state, decision_key, result)
+
+
+def triage_router_batch(states, config, store, llm_router, llm_router_fast=None):
+    """
+    Classify several emails of one user with a single LLM call.
+    
+    Emails the rules classify or that were recently classified under the same
+    rules are answered without the LLM. The rest share one system prompt
+    holding the user's rules, and are enumerated in one user message after
+    the few-shot examples retrieved for any of them. Decisions are matched
+    to emails by the number they are tagged with; emails without exactly
+    one decision, or all of them if the output cannot be parsed, are left
+    as None for the caller to classify one at a time.
+    
+    Args:
+        states: Application states, one per email, all for the same user.
+        config: Configuration object containing user settings.
+        store: Memory store for retrieving and storing information.
+        llm_router: Language model configured for RouterBatch structured output.
+        llm_router_fast: Optional language model with TriageLabelBatch structured
+            output, used unless the run sets ``configurable.explain``.
+        
+    Returns:
+        list: One Command (or None if unmatched) per state, in the same order.
+    """
+    user_id = config['configurable']['langgraph_user_id']
+    
+    commands = [_rules_route(state) for state in states]
     
-    # Construct the user prompt with email details
-    user_prompt = triage_user_prompt.format(
-        author=author, 
-        to=to, 
-        subject=subject, 
-        email_thread=email_thread
+    # Reuse the decisions for emails classified recently under the same rules
+    system_blocks = _system_blocks(states[0], store, user_id)
+    llm_router, label_only = _select_router(config, llm_router, llm_router_fast)
+    pending = []
+    for i, state in enumerate(states):
+        if commands[i] is not None:
+            continue
+        decision_key = _decision_key(user_id, system_blocks, state['email_input'])
+        result = _cached_decision(decision_key, label_only)
+        if result is not None:
+            commands[i] = _route(state, result)
+        else:
+            pending.append((i, state, decision_key))
+    if not pending:
+        return commands
+    
+    # Examples retrieved for several emails are included once
+    examples = {}
+    for _, state, _ in pending:
+        for example in _search_examples(store, user_id, state):
+            examples.setdefault((example.namespace, example.key), example)
+    examples_block = render_triage_examples_prompt(
+        examples=format_few_shot_examples(examples.values())
     )
     
-    # Call the language model to classify the email
-    result = llm_router.invoke(
-        [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ]
+    user_prompt = render_triage_batch_user_prompt(
+        count=len(pending),
+        emails="".join(
+            render_triage_batch_email_prompt(
+                index=index,
+                author=author,
+                to=to,
+                subject=subject,
+                email_thread=trim_thread(email_thread)
+            )
+            for index, (author, to, subject, email_thread) in enumerate(
+                (_email_fields(state['email_input']) for _, state, _ in pending), 1
+            )
+        )
     )
     
-    # Log the email processing
-    log_email_processing(state['email_input'], result.classification, result.reasoning)
+    try:
+        result = _invoke_router(llm_router, user_id, system_blocks, examples_block + user_prompt)
+    except ValueError as e:
+        # Output parsing and schema validation errors are ValueErrors
+        debug(f"Batched triage output could not be parsed: {e}")
+        return commands
     
-    # Handle the classification result
-    if result.classification == "respond":
-        classification_text = "RESPOND - This email requires a response"
-        print(f"📧 Classification: {classification_text}")
-        goto = "response_agent"
-        update = {
-            "messages": [
-                {
-                    "role": "user",
-                    "content": f"Respond to the email {state['email_input']}",
-                }
-            ],
-            "classification": result.classification,
-            "reasoning": result.reasoning
-        }
-    elif result.classification == "ignore":
-        classification_text = "IGNORE - This email can be safely ignored"
-        print(f"🚫 Classification: {classification_text}")
-        update = {
-            "classification": result.classification,
-            "reasoning": result.reasoning
-        }
-        goto = "__end__"
-    elif result.classification == "notify":
-        classification_text = "NOTIFY - This email contains important information"
-        print(f"🔔 Classification: {classification_text}")
-        update = {
-            "classification": result.classification,
-            "reasoning": result.reasoning
-        }
-        goto = "__end__"
-    else:
-        raise ValueError(f"Invalid classification: {result.classification}")
-    
-    return Command(goto=goto, update=update)
\ No newline at end of file
+    # Emails with no decision, or with several, are left unmatched
+    decisions = {}
+    for decision in result.decisions:
+        decisions[decision.index] = None if decision.index in decisions else decision
+    for index, (i, state, decision_key) in enumerate(pending, 1):
+        decision = decisions.get(index)
+        if decision is not None:
+            commands[i] = _classified_route(state, decision_key, decision)
+    unmatched = commands.count(None)
+    if unmatched:
+        debug(f"Batched triage left {unmatched} of {len(pending)} emails unmatched")
+    return commands
+
+
+class RouterCascade:
+    """
+    Two-tier triage router: a small model first, the main model when unsure.
+    
+    The small model returns its confidence with the classification; results
+    below the threshold are classified again by the large model, and accepted
+    ones are returned as the large model's schema. For batched
+    calls the whole batch is escalated when any of its decisions is below the
+    threshold. The share of escalated calls is logged at debug level.
+    """
+    
+    def __init__(self, llm_small, llm_large, schema, threshold=0.8):
+        """
+        Initialize the cascade.
+        
+        Args:
+            llm_small: Small language model with scored structured output
+                (e.g. ScoredRouter or ScoredTriageLabelBatch).
+            llm_large: Main language model with the unscored counterpart
+                (e.g. Router or TriageLabelBatch).
+            schema: Pydantic model of the main model's output, which accepted
+                results of the small model are converted to.
+            threshold: Minimum confidence for accepting the small model's result.
+        """
+        self.llm_small = llm_small
+        self.llm_large = llm_large
+        self.schema = schema
+        self.threshold = threshold
+        self.calls = 0
+        self.escalations = 0
+    
+    def _accept(self, result):
+        # Returns the small model's result as the main model's schema, or None
+        # if it has to be escalated
+        self.calls += 1
+        decisions = getattr(result, "decisions", None)
+        if decisions is None:
+            confidence = result.confidence
+        else:
+            confidence = min((d.confidence for d in decisions), default=1.0)
+        if confidence >= self.threshold:
+            # The schemas ignore extra fields, so the confidences are dropped
+            return self.schema.model_validate(result.model_dump())
+        
+        self.escalations += 1
+        debug(
+            f"Triage escalated (confidence {confidence:.2f}); "
+            f"escalation rate {self.escalations / self.calls:.0%}"
+        )
+        return None
+    
+    def invoke(self, messages, **kwargs):
+        """
+        Classify an email, escalating low-confidence results.
+        
+        Args:
+            messages: Router input messages.
+            **kwargs: Extra arguments passed to both models.
+            
+        Returns:
+            BaseModel: The accepted classification, as an instance of the schema.
+        """
+        result = self._accept(self.llm_small.invoke(messages, **kwargs))
+        if result is None:
+            result = self.llm_large.invoke(messages, **kwargs)
+        return result
+    
+    async def ainvoke(self, messages, **kwargs):
+        """
+        Async variant of invoke.
+        """
+        result = self._accept(await self.llm_small.ainvoke(messages, **kwargs))
+        if result is None:
+            result = await self.llm_large.ainvoke(messages, **kwargs)
+        return result
+
+
+class TriageBatcher:
+    """
+    Collects concurrent triage requests and classifies them in batched calls.
+    
+    Used as the triage node of the graph: emails classified by the rules or
+    found in the decision cache are answered at once, and every other request
+    waits until its group is flushed. Requests are grouped per user, since the system prompt holds
+    that user's rules, and runs that set ``configurable.explain`` are kept
+    apart from label-only runs. A group is flushed once it holds max_size
+    emails or window seconds after its first email arrived. A group of one
+    email, and any email the batched call returned no decision for, is
+    classified with the regular single-email router and that request's own
+    config.
+    """
+    
+    def __init__(self, store, llm_router, llm_router_batch, max_size=8, window=0.02,
+                 llm_router_fast=None, llm_router_batch_fast=None):
+        """
+        Initialize the batcher.
+        
+        Args:
+            store: Memory store for retrieving and storing information.
+            llm_router: Language model with Router structured output.
+            llm_router_batch: Language model with RouterBatch structured output.
+            max_size: Maximum number of emails classified in one call.
+            window: Seconds to wait for more emails after the first one arrives.
+            llm_router_fast: Optional language model with TriageLabel structured
+                output for single emails.
+            llm_router_batch_fast: Optional language model with TriageLabelBatch
+                structured output for batches.
+        """
+        self.store = store
+        self.llm_router = llm_router
+        self.llm_router_batch = llm_router_batch
+        self.llm_router_fast = llm_router_fast
+        self.llm_router_batch_fast = llm_router_batch_fast
+        self.max_size = max_size
+        self.window = window
+        self._pending = {}  # (user_id, label_only) -> [(state, config, future)]
+        self._tasks = set()
+    
+    async def triage(self, state: State, config) -> Command[
+        Literal["response_agent", "__end__"]
+    ]:
+        """
+        Queue an email for batched classification and wait for its result.
+        
+        Args:
+            state: Current application state containing the email.
+            config: Configuration object containing user settings.
+            
+        Returns:
+            Command: Indicates the next step in the workflow and any state updates.
+        """
+        # Trivially classifiable emails are not queued
+        command = _rules_route(state)
+        if command is not None:
+            return command
+        
+        user_id = config['configurable']['langgraph_user_id']
+        _, label_only = _select_router(config, self.llm_router, self.llm_router_fast)
+        
+        # Recently classified emails are not queued either; without the
+        # pre-rendered rules the check is left to the batch call
+        system_blocks = state.get('triage_prompt_cached')
+        if system_blocks is not None:
+            result = _cached_decision(_decision_key(user_id, system_blocks, state['email_input']), label_only)
+            if result is not None:
+                return _route(state, result)
+        
+        loop = asyncio.get_running_loop()
+        group_key = (user_id, label_only)
+        future = loop.create_future()
+        
+        group = self._pending.get(group_key)
+        if group is None:
+            group = self._pending[group_key] = []
+            loop.call_later(self.window, self._flush, group_key, group)
+        group.append((state, config, future))
+        if len(group) >= self.max_size:
+            self._flush(group_key, group)
+        
+        return await future
+    
+    def _flush(self, group_key, group):
+        # The window timer fires even if the group was already flushed when full
+        if self._pending.get(group_key) is not group:
+            return
+        del self._pending[group_key]
+        task = asyncio.ensure_future(self._classify(group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _classify(self, group):
+        commands = [None] * len(group)
+        if len(group) > 1:
+            states = [state for state, _, _ in group]
+            # Requests of a group share the user and the explain setting
+            try:
+                commands = await asyncio.to_thread(
+                    triage_router_batch, states, group[0][1], self.store,
+                    self.llm_router_batch, self.llm_router_batch_fast
+                )
+            except Exception as e:
+                for _, _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        
+        # Emails without a batched decision are routed one at a time
+        await asyncio.gather(*(
+            self._resolve(state, config, future, command)
+            for (state, config, future), command in zip(group, commands)
+        ))
+    
+    async def _resolve(self, state, config, future, command):
+        try:
+            if command is None:
+                command = await atriage_router(
+                    state, config, self.store, self.llm_router, self.llm_router_fast
+                )
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(command)
@@ -0,0 +1,35 @@
+from src.utils.email import trim_thread
+
+
+def test_short_thread_is_kept_whole():
+    text = "FYI, see below.\n\n-----Original Message-----\nFrom: CEO\nCan you confirm the budget?"
+    assert trim_thread(text) == text
+
+
+def test_long_reply_drops_quoted_history():
+    text = "Sounds good, let's meet at 3pm.\n\nOn Mon, Alice wrote:\n> " + "earlier text " * 300
+    assert trim_thread(text) == "Sounds good, let's meet at 3pm."
+
+
+def test_long_reply_drops_trailing_quoted_lines():
+    quoted = "\n".join("> earlier line %d" % i for i in range(200))
+    text = "Thanks, approved.\n" + quoted
+    assert trim_thread(text) == "Thanks, approved."
+
+
+def test_interleaved_reply_keeps_inline_quotes():
+    request = "Could you review the error handling section and send comments by Friday? " * 30
+    text = "Please check:\n> spec line\n" + request
+    trimmed = trim_thread(text)
+    assert trimmed.startswith("Please check:\n> spec line\nCould you review")
+    assert len(trimmed) == 2000
+
+
+def test_long_forward_keeps_forwarded_body_under_cover_note():
+    text = (
+        "FYI, see below.\n\n-----Original Message-----\nFrom: CEO\nCan you confirm the budget?"
+        "\n\nOn Mon, Bob wrote:\n> " + "old " * 1000
+    )
+    assert trim_thread(text) == (
+        "FYI, see below.\n\n-----Original Message-----\nFrom: CEO\nCan you confirm the budget?"
+    )
@@ -0,0 +1,48 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.memory import trim
+from src.memory.trim import trim_messages
+
+
+class FakeSummarizer:
+    def __init__(self):
+        self.transcripts = []
+
+    async def ainvoke(self, messages):
+        self.transcripts.append(messages[-1].content)
+        return AIMessage(content=f"summary {len(self.transcripts)}")
+
+
+def _history(recipient):
+    messages = [
+        AIMessage(content="", tool_calls=[{
+            "name": "write_email", "args": {"to": recipient, "subject": "Re: API"}, "id": "call_1"
+        }]),
+        ToolMessage(content="Email sent", tool_call_id="call_1", name="write_email"),
+    ]
+    for i in range(8):
+        messages.append(HumanMessage(content=f"question {i}"))
+        messages.append(AIMessage(content=f"answer {i}"))
+    return messages
+
+
+def test_summary_includes_tool_calls():
+    trim._SUMMARY_CACHE.clear()
+    summarizer = FakeSummarizer()
+    trimmed = asyncio.run(trim_messages(_history("alice@company.com"), k=6, summarizer=summarizer, threshold=16))
+
+    assert len(summarizer.transcripts) == 1
+    assert 'write_email({"subject": "Re: API", "to": "alice@company.com"})' in summarizer.transcripts[0]
+    assert trimmed[0].content.startswith("Summary of the earlier conversation:")
+
+
+def test_histories_differing_in_tool_calls_are_summarized_separately():
+    trim._SUMMARY_CACHE.clear()
+    summarizer = FakeSummarizer()
+    asyncio.run(trim_messages(_history("alice@company.com"), k=6, summarizer=summarizer, threshold=16))
+    asyncio.run(trim_messages(_history("bob@company.com"), k=6, summarizer=summarizer, threshold=16))
+
+    assert len(summarizer.transcripts) == 2
+    assert "bob@company.com" in summarizer.transcripts[1]